@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+speakup - Allokations-Benchmark Audiopfad
+Vergleicht den alten int16/bytes-Pfad (tobytes, BytesIO, astype + Division
+pro Fenster) mit dem float32-Pfad (vorab angelegte Puffer, Views bis zur
+Engine). Gemessen werden mit tracemalloc die temporär allokierten Bytes pro
+Stufe und die CPU-Zeit pro Sekunde Audio; VAD-Interna zählen nicht mit.
+"""
+
+import io
+import os
+import sys
+import time
+import tracemalloc
+import types
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'speakup'))
+
+from main import App
+from ringbuffer import RingBuffer, SPSCRing
+
+SAMPLE_RATE = 16000
+SECONDS = 30
+CALLBACK = 512                  # Samples pro PortAudio-Callback
+BLOCK = SAMPLE_RATE // 10       # process_ms = 100
+WINDOW = int(SAMPLE_RATE * 0.8)
+OVERLAP = int(SAMPLE_RATE * 0.2)
+UTTERANCE_EVERY = 30            # Blöcke (3 s) bis zum VAD-Ende
+
+
+class Alloc:
+    """Summe der Allokationsspitzen pro Stufe (tracemalloc)"""
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.bytes = {}
+
+    def __call__(self, stage, fn, *args):
+        if not self.enabled:
+            return fn(*args)
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        result = fn(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+        self.bytes[stage] = self.bytes.get(stage, 0) + max(0, peak - before)
+        return result
+
+
+def legacy_path(audio, alloc):
+    """Bisheriger Pfad: int16-Capture, bytes in den Queues, Float erst pro Fenster"""
+    ring = SPSCRing(SAMPLE_RATE * 2, dtype=np.int16)
+    proc = np.zeros(ring.capacity, dtype=np.int16)
+    indata = np.zeros((CALLBACK, 1), dtype=np.int16)
+    chunk_buf = RingBuffer(SAMPLE_RATE * 30, dtype=np.int16)
+    utterance = io.BytesIO()
+    pcm = (audio * 32767).astype(np.int16)
+    engine_input = []
+
+    def process(block):
+        data = block.tobytes()              # AudioBlock
+        utterance.write(block.tobytes())    # VAD-Puffer
+        return data
+
+    def window():
+        return chunk_buf.view().astype(np.float32) / 32768.0
+
+    def finish():
+        data = utterance.getvalue()
+        return np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+
+    blocks = 0
+    for i in range(0, len(pcm) - CALLBACK + 1, CALLBACK):
+        indata[:, 0] = pcm[i:i + CALLBACK]
+        alloc("capture", ring.push, indata[:, 0])
+        if len(ring) < BLOCK:
+            continue
+        n = ring.pop_into(proc[:BLOCK])
+        data = alloc("processing", process, proc[:n])
+        alloc("window", chunk_buf.write, data)
+        if len(chunk_buf) >= WINDOW:
+            engine_input.append(alloc("window", window))
+            chunk_buf.keep(OVERLAP)
+        blocks += 1
+        if blocks % UTTERANCE_EVERY == 0:
+            engine_input.append(alloc("utterance", finish))
+            utterance = io.BytesIO()
+        del engine_input[:]     # Engine „verbraucht" die Eingabe sofort
+
+
+def float_path(audio, alloc):
+    """Neuer Pfad: float32 von PortAudio bis zur Engine (App._to_int16 nur für die VAD)"""
+    ring = SPSCRing(SAMPLE_RATE * 2, dtype=np.float32)
+    proc = np.zeros(ring.capacity, dtype=np.float32)
+    indata = np.zeros((CALLBACK, 1), dtype=np.float32)
+    chunk_buf = RingBuffer(SAMPLE_RATE * 30, dtype=np.float32)
+    app = types.SimpleNamespace(_scratch=np.zeros(ring.capacity, dtype=np.float32),
+                                _pcm16=np.zeros(ring.capacity, dtype=np.int16),
+                                utterance=RingBuffer(SAMPLE_RATE * 30, dtype=np.float32))
+    engine_input = []
+
+    def process(block):
+        App._to_int16(app, block)           # int16 für webrtcvad
+        copy = block.copy()                 # AudioBlock
+        app.utterance.write(copy)
+        return copy
+
+    def finish():
+        data = app.utterance.view().copy()
+        app.utterance.clear()
+        return data
+
+    blocks = 0
+    for i in range(0, len(audio) - CALLBACK + 1, CALLBACK):
+        indata[:, 0] = audio[i:i + CALLBACK]
+        alloc("capture", ring.push, indata[:, 0])
+        if len(ring) < BLOCK:
+            continue
+        n = ring.pop_into(proc[:BLOCK])
+        data = alloc("processing", process, proc[:n])
+        alloc("window", chunk_buf.write, data)
+        if len(chunk_buf) >= WINDOW:
+            engine_input.append(alloc("window", chunk_buf.view))
+            chunk_buf.keep(OVERLAP)
+        blocks += 1
+        if blocks % UTTERANCE_EVERY == 0:
+            engine_input.append(alloc("utterance", finish))
+        del engine_input[:]
+
+
+def run(path, audio):
+    cpu = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        path(audio, Alloc(False))
+        cpu = min(cpu, time.perf_counter() - t0)
+
+    alloc = Alloc(True)
+    tracemalloc.start()
+    path(audio, alloc)
+    tracemalloc.stop()
+    return cpu / SECONDS, {k: v / SECONDS for k, v in alloc.bytes.items()}
+
+
+def main():
+    rng = np.random.default_rng(0)
+    audio = (rng.normal(0, 0.1, SAMPLE_RATE * SECONDS)).clip(-1, 1).astype(np.float32)
+
+    results = [("int16/bytes", *run(legacy_path, audio)), ("float32", *run(float_path, audio))]
+    stages = ("capture", "processing", "window", "utterance")
+    print(f"{SECONDS}s Audio, Fenster 0.8s/0.2s, Äußerung alle 3s – pro Sekunde Audio")
+    print(f"{'Pfad':<14}" + "".join(f"{s:>13}" for s in stages) + f"{'gesamt':>13}{'CPU':>11}")
+    for name, cpu, alloc in results:
+        total = sum(alloc.values())
+        print(f"{name:<14}" + "".join(f"{alloc.get(s, 0) / 1024:>10.1f} KB" for s in stages)
+              + f"{total / 1024:>10.1f} KB{cpu * 1e3:>8.3f} ms")
+    old, new = (sum(r[2].values()) for r in results)
+    print(f"Allokationen: {new / old:.0%} des alten Pfads")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+speakup - End-to-End Benchmark
+Spielt WAV-Dateien blockweise durch VADStream → STTWorker → text_q ab
+(Echtzeit oder beschleunigt) und misst First-Word-Latenz, End-of-Utterance-
+Latenz, Real-Time-Factor und Zeit pro Stufe. Ergebnis als JSON.
+
+Beispiele:
+    python benchmarks/bench_pipeline.py --synthetic --engine stub --speed 0
+    python benchmarks/bench_pipeline.py diktat.wav --engine faster-whisper --model tiny
+    python benchmarks/bench_pipeline.py --synthetic -o neu.json --baseline alt.json
+"""
+
+import argparse
+import collections
+import json
+import os
+import platform
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'speakup'))
+sys.path.insert(0, ROOT)
+
+import main
+from engines import final_config
+from main import App, Final, load_config
+from transcribe import load_audio
+
+SAMPLE_RATE = 16000
+
+
+# --- Instrumentierung ------------------------------------------------------
+
+class TimedQueue(queue.Queue):
+    """Queue, die Wartezeit und maximale Tiefe ihrer Elemente mitschreibt"""
+
+    def _init(self, maxsize):
+        super()._init(maxsize)
+        self.waits = []
+        self.max_depth = 0
+
+    def _put(self, item):
+        super()._put((time.perf_counter(), item))
+        self.max_depth = max(self.max_depth, self._qsize())
+
+    def _get(self):
+        t, item = super()._get()
+        self.waits.append(time.perf_counter() - t)
+        return item
+
+
+class TimedAudioQueue(main.AudioQueue):
+    """AudioQueue mit Wartezeit pro Element (Zeitstempel parallel zur deque)"""
+
+    def _init(self, maxsize):
+        super()._init(maxsize)
+        self.waits = []
+        self._stamps = collections.deque()
+
+    def _append(self, item):
+        super()._append(item)
+        self._stamps.append(time.perf_counter())
+
+    def _popleft(self):
+        self.waits.append(time.perf_counter() - self._stamps.popleft())
+        return super()._popleft()
+
+    def _remove(self, index):
+        super()._remove(index)
+        del self._stamps[index]
+
+
+class TimedEngine:
+    """Proxy um eine Engine: misst jeden transcribe()/transcribe_batch()-Aufruf"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.calls = []         # (Audiosekunden, Rechenzeit, Batchgröße)
+        self.busy = False
+
+    def __getattr__(self, name):
+        return getattr(self.engine, name)
+
+    def _timed(self, fn, audios, *args, **kwargs):
+        self.busy = True
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            seconds = sum(len(a) for a in audios) / SAMPLE_RATE
+            self.calls.append((seconds, time.perf_counter() - t0, len(audios)))
+            self.busy = False
+
+    def transcribe(self, audio, **kwargs):
+        return self._timed(self.engine.transcribe, [audio], audio, **kwargs)
+
+    def transcribe_batch(self, audios, **kwargs):
+        return self._timed(self.engine.transcribe_batch, audios, audios, **kwargs)
+
+
+# --- Replay ----------------------------------------------------------------
+
+class ReplayApp(App):
+    """App ohne Audiogerät und Tastatur – Blöcke kommen aus der WAV-Datei"""
+
+    audio_queue_class = TimedAudioQueue
+    text_queue_class = TimedQueue
+
+    def __init__(self, cfg, engine):
+        # Keine Nebenwirkungen außerhalb des Laufs: nichts auf die Platte, kein HTTP
+        cfg = dict(cfg, log_transcripts=False,
+                   record=dict(cfg.get("record") or {}, enable=False),
+                   metrics=dict(cfg.get("metrics") or {}, http=False))
+        super().__init__(cfg, engine)
+        self.active = True
+
+
+def synthetic_speech(utterances=3, speech_s=2.0, pause_s=1.5):
+    """Sprachähnliches Signal (modulierte Harmonische) mit Pausen"""
+    rng = np.random.default_rng(0)
+    parts = []
+    for _ in range(utterances):
+        t = np.arange(int(speech_s * SAMPLE_RATE)) / SAMPLE_RATE
+        f0 = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+        phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+        voice = sum(np.sin(k * phase) / k for k in range(1, 12))
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2
+        parts.append(0.3 * voice * envelope / 3)
+        parts.append(rng.normal(0, 0.002, int(pause_s * SAMPLE_RATE)))
+    return np.concatenate(parts).astype(np.float32)
+
+
+def replay(cfg, engine, audio, speed, block_ms, tail_s=2.0, drain_timeout=120.0):
+    app = ReplayApp(cfg, engine)
+    block = int(SAMPLE_RATE * block_ms / 1000)
+    samples = np.clip(audio, -1, 1).astype(np.float32)
+    samples = np.concatenate([samples, np.zeros(int(tail_s * SAMPLE_RATE), dtype=np.float32)])
+
+    texts = []                  # (wall, text)
+    finals = []                 # Latenz des Final-Tiers je Äußerung
+    stop = threading.Event()
+
+    def output_loop():
+        # Ersetzt den Output-Loop aus App.run_hotkey_loop (ohne pynput)
+        while not stop.is_set():
+            try:
+                text = app.text_q.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            if isinstance(text, Final):
+                # Final-Tier: Latenz ab VAD-Ende (beide Zeiten time.time())
+                finals.append(time.time() - text.end_t)
+                continue
+            texts.append((time.perf_counter(), text))
+
+    out = threading.Thread(target=output_loop, daemon=True)
+    app.stt.start()
+    out.start()
+
+    feed_times = []             # Wall-Zeit pro Block
+    onsets = []                 # Wall-Zeit erster stimmhafter Block je Äußerung
+    ends = []                   # (Wall letzter stimmhafter Block, Wall End-Event)
+    vad_time = 0.0
+    was_speech = False
+    last_voiced_wall = None
+
+    t0 = time.perf_counter()
+    for i in range(0, len(samples) - block + 1, block):
+        tau = i / SAMPLE_RATE   # Audio-Uhr
+        if speed > 0:
+            delay = t0 + tau / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        now = time.perf_counter()
+        feed_times.append(now)
+
+        last_voice = app.vad.last_voice
+        ts = time.perf_counter()
+        end_event = app.process_block(samples[i:i + block], tau + block / SAMPLE_RATE)
+        vad_time += time.perf_counter() - ts
+
+        if app.vad.last_voice != last_voice:
+            last_voiced_wall = now
+        if app.vad.in_speech and not was_speech:
+            onsets.append(now)
+        if end_event:
+            ends.append((last_voiced_wall, now))
+        was_speech = app.vad.in_speech
+    feed_end = time.perf_counter()
+
+    # Warten bis Worker und Output leergelaufen sind
+    model = engine
+    final = app.stt.final
+    idle_since = None
+    deadline = time.perf_counter() + drain_timeout
+    while time.perf_counter() < deadline:
+        idle = (app.audio_q.qsize() == 0 and app.text_q.qsize() == 0 and not model.busy
+                and not (final and final.pending))
+        if idle:
+            idle_since = idle_since or time.perf_counter()
+            if time.perf_counter() - idle_since > 0.5:
+                break
+        else:
+            idle_since = None
+        time.sleep(0.02)
+    app.stt.stop(drain=False)
+    stop.set()
+    out.join(timeout=1)
+    wall = time.perf_counter() - t0
+
+    # Latenzen aus den Zeitstempeln ableiten
+    first_word = []
+    for k, onset in enumerate(onsets):
+        nxt = onsets[k + 1] if k + 1 < len(onsets) else float("inf")
+        hits = [t for t, _ in texts if onset <= t]
+        if hits and hits[0] < nxt:
+            first_word.append(hits[0] - onset)
+    eou = []
+    for last_voiced, evt in ends:
+        hits = [t for t, _ in texts if t >= evt]
+        if hits and last_voiced:
+            eou.append(hits[0] - last_voiced)
+
+    duration = len(audio) / SAMPLE_RATE
+    infer = sum(dt for _, dt, _ in model.calls)
+    decoded = sum(a for a, _, _ in model.calls)
+    return {
+        "audio_seconds": round(duration, 3),
+        "wall_seconds": round(wall, 3),
+        "feed_seconds": round(feed_end - t0, 3),
+        "rtf": round(infer / duration, 4) if duration else None,
+        "decoded_audio_ratio": round(decoded / duration, 3) if duration else None,
+        "inference_calls": len(model.calls),
+        "first_word_latency": _stats(first_word),
+        "end_of_utterance_latency": _stats(eou),
+        "final_latency": _stats(finals),
+        "first_word_latencies": [round(x, 4) for x in first_word],
+        "end_of_utterance_latencies": [round(x, 4) for x in eou],
+        "final_latencies": [round(x, 4) for x in finals],
+        "utterances": len(onsets),
+        "texts": [t for _, t in texts],
+        "stages": {
+            "vad_and_chunking_s": round(vad_time, 4),
+            "vad_per_block_us": round(vad_time / max(1, len(feed_times)) * 1e6, 2),
+            "preprocess_per_block_us": round(app.preprocess.per_block_us, 2) if app.preprocess else None,
+            "vad_frames_gated": round(app.vad.frames_gated / max(1, app.vad.frames_total), 3),
+            "audio_queue_wait": _stats(app.audio_q.waits),
+            "audio_queue_max_depth": app.audio_q.max_depth,
+            "audio_queue_dropped_s": round(app.audio_q.dropped_seconds, 3),
+            "audio_queue_spooled": app.audio_q.spooled,
+            "inference_s": round(infer, 4),
+            "inference_per_call": _stats([dt for _, dt, _ in model.calls]),
+            "final_inference_s": round(final.decode_seconds, 4) if final else None,
+            "final_utterances": final.decoded if final else None,
+            "batch_size": _stats([n for _, _, n in model.calls]),
+            "text_queue_wait": _stats(app.text_q.waits),
+            "skipped_windows": app.stt.skipped_windows,
+            "skipped_audio_s": round(app.stt.skipped_audio_seconds, 3),
+            "saved_inference_s": round(app.stt.saved_inference_seconds, 4),
+            "window_seconds": round(app.stt.window.seconds, 3),
+            "window_adjustments": app.stt.window.adjustments,
+        },
+    }
+
+
+def _stats(values):
+    if not values:
+        return None
+    a = np.asarray(values, dtype=np.float64)
+    return {
+        "n": int(len(a)),
+        "mean": round(float(a.mean()), 4),
+        "p50": round(float(np.percentile(a, 50)), 4),
+        "p95": round(float(np.percentile(a, 95)), 4),
+        "max": round(float(a.max()), 4),
+    }
+
+
+# --- Vergleich mit Baseline -------------------------------------------------
+
+# Kennzahl → Pfad im Summary; alle "kleiner ist besser"
+TRACKED = {
+    "rtf": ("rtf",),
+    "first_word_p50": ("first_word_latency", "p50"),
+    "end_of_utterance_p50": ("end_of_utterance_latency", "p50"),
+    "final_latency_p50": ("final_latency", "p50"),
+    "vad_per_block_us": ("stages", "vad_per_block_us"),
+}
+
+
+def _lookup(d, path):
+    for key in path:
+        if not isinstance(d, dict) or d.get(key) is None:
+            return None
+        d = d[key]
+    return d
+
+
+def compare(result, baseline, tolerance):
+    regressions = []
+    for name, path in TRACKED.items():
+        new, old = _lookup(result["summary"], path), _lookup(baseline.get("summary", {}), path)
+        if new is None or old is None or old <= 0:
+            continue
+        change = (new - old) / old
+        print(f"  {name:<24} {old:>10.4f} → {new:>10.4f}  ({change:+.1%})")
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+# --- CLI -------------------------------------------------------------------
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="speakup End-to-End Benchmark")
+    parser.add_argument("wavs", nargs="*", help="WAV/FLAC-Dateien (16 kHz mono empfohlen)")
+    parser.add_argument("--synthetic", action="store_true", help="Synthetisches Testsignal verwenden")
+    parser.add_argument("--config", default=os.path.join(ROOT, "speakup", "config.yaml"))
+    parser.add_argument("--engine", choices=["stub", "faster-whisper"], default="stub")
+    parser.add_argument("--model", default="tiny", help="Modell für faster-whisper (CPU)")
+    parser.add_argument("--stub-rtf", type=float, default=0.05, help="Simulierte Rechenzeit des Stubs")
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="Fixe Kosten pro Stub-Aufruf (s)")
+    parser.add_argument("--fixed-window", action="store_true", help="Fensterlänge nicht anpassen")
+    parser.add_argument("--speed", type=float, default=1.0, help="Abspieltempo (1 = Echtzeit, 0 = max)")
+    parser.add_argument("--block-ms", type=int, default=None,
+                        help="Blockgröße (Standard: audio.process_ms wie im Verarbeitungs-Thread)")
+    parser.add_argument("--streaming", action="store_true", help="Streaming-Modus erzwingen")
+    parser.add_argument("--preprocess", action="store_true", help="Noise-Gate und AGC einschalten")
+    parser.add_argument("--final", action="store_true",
+                        help="Zweistufig: Final-Modell dekodiert Äußerungen nach")
+    parser.add_argument("--final-model", default="small", help="Final-Modell für faster-whisper (CPU)")
+    parser.add_argument("--final-stub-rtf", type=float, default=0.3, help="Rechenzeit des Final-Stubs")
+    parser.add_argument("--no-pregate", action="store_true", help="Energie-Vorfilter der VAD abschalten")
+    parser.add_argument("-o", "--output", help="JSON-Ergebnisdatei (Standard: stdout)")
+    parser.add_argument("--baseline", help="Früheres Ergebnis zum Vergleich")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Erlaubte Verschlechterung (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    if not args.wavs and not args.synthetic:
+        parser.error("WAV-Dateien angeben oder --synthetic verwenden")
+
+    cfg = load_config(args.config)
+    if args.block_ms is None:
+        args.block_ms = cfg.get("audio", {}).get("process_ms", 100)
+    if args.streaming:
+        cfg.setdefault("streaming", {})["enable"] = True
+    if args.preprocess:
+        cfg.setdefault("preprocess", {})["enable"] = True
+    if args.no_pregate:
+        cfg["vad"]["pregate"] = False
+    if args.fixed_window:
+        cfg["chunk"]["adaptive"] = False
+    if args.engine == "stub":
+        cfg.update(engine="stub", model="stub", device="cpu", stub_rtf=args.stub_rtf,
+                   stub_latency=args.stub_latency)
+    else:
+        cfg.update(engine="faster-whisper", model=args.model, device="cpu")
+    if args.final:
+        if args.engine == "stub":
+            # Eigener Modellname, sonst liefert der Cache dasselbe Stub-Objekt
+            final = {"model": "stub-final", "stub_rtf": args.final_stub_rtf}
+        else:
+            final = {"model": args.final_model}
+        cfg["final"] = dict(cfg.get("final") or {}, enable=True, **final)
+    engine = main.init_engine(cfg)
+
+    inputs = [("synthetic", synthetic_speech())] if args.synthetic else []
+    inputs += [(path, load_audio(path)) for path in args.wavs]
+
+    files = []
+    for name, audio in inputs:
+        print(f"[bench] {name} ({len(audio) / SAMPLE_RATE:.1f}s) ...", file=sys.stderr)
+        res = replay(cfg, TimedEngine(engine), audio, args.speed, args.block_ms)
+        res["file"] = name
+        files.append(res)
+
+    import speakup
+    result = {
+        "speakup_version": speakup.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "engine": args.engine,
+            "model": cfg["model"],
+            "speed": args.speed,
+            "block_ms": args.block_ms,
+            "streaming": bool(cfg.get("streaming", {}).get("enable")),
+            "final": final_config(cfg) is not None,
+            "chunk": cfg["chunk"],
+            "vad": cfg["vad"],
+            "preprocess": cfg.get("preprocess", {}),
+        },
+        "files": files,
+        "summary": _summary(files),
+    }
+
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"[bench] Vergleich mit {args.baseline}:", file=sys.stderr)
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print(f"[bench] ✗ Regression: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+        print("[bench] ✓ keine Regression", file=sys.stderr)
+    return 0
+
+
+def _summary(files):
+    audio = sum(f["audio_seconds"] for f in files)
+    infer = sum(f["stages"]["inference_s"] for f in files)
+    blocks_us = [f["stages"]["vad_per_block_us"] for f in files]
+
+    def pooled(key):
+        return _stats([x for f in files for x in f[key]])
+
+    return {
+        "audio_seconds": round(audio, 3),
+        "rtf": round(infer / audio, 4) if audio else None,
+        "first_word_latency": pooled("first_word_latencies"),
+        "end_of_utterance_latency": pooled("end_of_utterance_latencies"),
+        "final_latency": pooled("final_latencies"),
+        "stages": {"vad_per_block_us": round(float(np.mean(blocks_us)), 2) if blocks_us else None},
+    }
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+speakup - Micro-Benchmark Resampler
+CPU-Zeit pro Sekunde Audio für native Aufnahmeraten → 16 kHz bei
+verschiedenen Blockgrößen (process_ms), dazu die Qualität: Fehler eines
+1-kHz-Tons und Dämpfung eines 10-kHz-Tons (würde ohne Tiefpass auf 6 kHz
+gespiegelt). Zum Vergleich lineare Interpolation (np.interp).
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'speakup'))
+
+from resample import PolyphaseResampler
+
+SECONDS = 30
+OUT_RATE = 16000
+RATES = (48000, 44100, 32000, 22050)
+
+
+def polyphase(x, rate, block):
+    r = PolyphaseResampler(rate, OUT_RATE)
+    out = []
+    for i in range(0, len(x), block):
+        out.append(r.process(x[i:i + block]).copy())
+    return np.concatenate(out), r.delay
+
+
+def interp(x, rate, block):
+    # Blockweise wie im Live-Pfad; Zeitraster läuft über Blockgrenzen weiter
+    out = []
+    step = rate / OUT_RATE
+    pos = 0.0
+    for i in range(0, len(x), block):
+        seg = x[i:i + block + 1]
+        t = np.arange(pos, len(seg) - 1, step)
+        out.append(np.interp(t, np.arange(len(seg)), seg).astype(np.float32))
+        pos = t[-1] + step - block if len(t) else pos - block
+    return np.concatenate(out), 0.0
+
+
+def cpu(fn, x, rate, block):
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        fn(x, rate, block)
+        best = min(best, time.perf_counter() - t0)
+    return best / (len(x) / rate)
+
+
+def quality(fn, rate):
+    t = np.arange(rate * 2) / rate
+    tone = np.sin(2 * np.pi * 1000 * t).astype(np.float32)
+    y, delay = fn(tone, rate, rate // 10)
+    ref = np.sin(2 * np.pi * 1000 * (np.arange(len(y)) / OUT_RATE - delay))
+    err = np.sqrt(np.mean((y - ref)[1000:-1000] ** 2))
+    alias = np.sin(2 * np.pi * 10000 * t).astype(np.float32)
+    y, _ = fn(alias, rate, rate // 10)
+    level = np.sqrt(2 * np.mean(y[1000:-1000] ** 2))
+    return 20 * np.log10(err + 1e-12), 20 * np.log10(level + 1e-12)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{SECONDS}s Audio → 16 kHz, CPU-Zeit pro Sekunde Audio")
+    print(f"{'Rate':>7} {'Block':>7} {'Polyphase':>11} {'np.interp':>11}")
+    for rate in RATES:
+        x = rng.normal(0, 0.1, rate * SECONDS).astype(np.float32)
+        for block_ms in (20, 100, 400):
+            block = rate * block_ms // 1000
+            print(f"{rate:>7} {block_ms:>5}ms {cpu(polyphase, x, rate, block) * 1e3:>8.3f} ms"
+                  f" {cpu(interp, x, rate, block) * 1e3:>8.3f} ms")
+
+    print("\nQualität (1 kHz: Fehler relativ zur Amplitude; 10 kHz: Restpegel nach Tiefpass)")
+    print(f"{'Rate':>7} {'Polyphase 1k':>13} {'10k':>8} {'np.interp 1k':>13} {'10k':>8}")
+    for rate in RATES:
+        p_err, p_alias = quality(polyphase, rate)
+        i_err, i_alias = quality(interp, rate)
+        print(f"{rate:>7} {p_err:>10.1f} dB {p_alias:>5.1f} dB {i_err:>10.1f} dB {i_alias:>5.1f} dB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+speakup - Micro-Benchmark Audio-Akkumulation
+Vergleicht das alte `chunk_buf += data` (bytes) mit dem RingBuffer
+bei wachsendem Rückstand (Backlog) im STTWorker.
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'speakup'))
+
+from ringbuffer import RingBuffer
+
+SAMPLE_RATE = 16000
+BLOCK_MS = 30
+REPEAT = 2000
+
+
+def bench_bytes(backlog_s, block):
+    """Alter Pfad: bytes konkatenieren und Overlap re-slicen"""
+    data = block.tobytes()
+    buf = b"\0" * int(SAMPLE_RATE * backlog_s) * 2
+    overlap_bytes = int(SAMPLE_RATE * 0.2) * 2
+    t0 = time.perf_counter()
+    for _ in range(REPEAT):
+        buf += data
+        tail = buf[-overlap_bytes:]
+    dt = time.perf_counter() - t0
+    del tail
+    return dt / REPEAT
+
+
+def bench_ring(backlog_s, block):
+    """Neuer Pfad: RingBuffer.write + Overlap-View"""
+    overlap = int(SAMPLE_RATE * 0.2)
+    capacity = int(SAMPLE_RATE * (backlog_s + 60))
+    buf = RingBuffer(capacity, dtype=np.int16)
+    buf.write(np.zeros(int(SAMPLE_RATE * backlog_s), dtype=np.int16))
+    t0 = time.perf_counter()
+    for _ in range(REPEAT):
+        buf.write(block)
+        tail = buf.overlap(overlap)
+    dt = time.perf_counter() - t0
+    del tail
+    return dt / REPEAT
+
+
+def main():
+    block = (np.random.randn(int(SAMPLE_RATE * BLOCK_MS / 1000)) * 1000).astype(np.int16)
+    print(f"Block: {BLOCK_MS} ms, {REPEAT} Wiederholungen")
+    print(f"{'Backlog':>10} {'bytes +=':>14} {'RingBuffer':>14}")
+    for backlog in (0.8, 5, 30, 120):
+        t_bytes = bench_bytes(backlog, block)
+        t_ring = bench_ring(backlog, block)
+        print(f"{backlog:>9.1f}s {t_bytes * 1e6:>11.1f} µs {t_ring * 1e6:>11.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+speakup - Micro-Benchmark VADStream
+CPU-Zeit pro Sekunde Audio mit und ohne Energie-Vorfilter, bei
+verschiedenen Blockgrößen und Dauer-Rauschen (Always-on-Szenario).
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'speakup'))
+
+from main import VADStream, load_config
+
+SAMPLE_RATE = 16000
+SECONDS = 60
+
+
+def run(cfg, pcm, block):
+    vad = VADStream(cfg)
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for i in range(0, len(pcm) - block + 1, block):
+            vad.process(pcm[i:i + block], i / SAMPLE_RATE)
+        best = min(best, time.perf_counter() - t0)
+    return best / SECONDS, vad.frames_gated / max(1, vad.frames_total)
+
+
+def main():
+    cfg = load_config(os.path.join(os.path.dirname(__file__), '..', 'speakup', 'config.yaml'))
+    rng = np.random.default_rng(0)
+    pcm = (rng.normal(0, 0.003, SAMPLE_RATE * SECONDS) * 32767).astype(np.int16)
+
+    print(f"{SECONDS}s Rauschen, Zeit pro Sekunde Audio")
+    print(f"{'Block':>8} {'ohne Vorfilter':>16} {'mit Vorfilter':>16} {'übersprungen':>14}")
+    for block_ms in (20, 40, 100, 200, 400):
+        block = SAMPLE_RATE * block_ms // 1000
+        cfg["vad"]["pregate"] = False
+        t_off, _ = run(cfg, pcm, block)
+        cfg["vad"]["pregate"] = True
+        t_on, gated = run(cfg, pcm, block)
+        print(f"{block_ms:>6}ms {t_off * 1e3:>13.3f} ms {t_on * 1e3:>13.3f} ms {gated:>13.0%}")
+
+
+if __name__ == "__main__":
+    main()
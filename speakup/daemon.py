@@ -0,0 +1,417 @@
+"""
+speakup daemon - Gemeinsamer Transkriptions-Dienst
+Hält ein Modell und nimmt Audio mehrerer lokaler Clients über einen Unix
+Domain Socket an. Fenster aus gleichzeitigen Sitzungen werden zu einem
+Engine-Aufruf gebündelt. Clients sind normale speakup-Instanzen mit
+engine: daemon (Aufnahme, VAD und Tippen laufen beim Client).
+
+Protokoll pro Nachricht: 8 Byte Kopf (Länge JSON, Länge Payload, je uint32
+big-endian), JSON-Header, Payload (float32-Audio, Puffer hintereinander).
+
+Der Socket liegt standardmäßig in einem 0700-Verzeichnis unter
+$XDG_RUNTIME_DIR. Beide Seiten prüfen den Benutzer der Gegenseite
+(SO_PEERCRED, sonst Eigentümer der Socket-Datei): der Client schickt kein
+Audio an einen fremden Prozess, der Daemon nimmt ohne shared nur Clients
+des eigenen Benutzers an.
+"""
+
+import json
+import os
+import queue
+import socket
+import stat
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from engines import Transcript
+from metrics import METRICS, DEPTH_BUCKETS
+
+
+def default_socket():
+    """$XDG_RUNTIME_DIR/speakup/daemon.sock, sonst ein eigenes Verzeichnis in /tmp"""
+    base = os.environ.get("XDG_RUNTIME_DIR")
+    if base:
+        return os.path.join(base, "speakup", "daemon.sock")
+    return os.path.join(tempfile.gettempdir(), f"speakup-{os.geteuid()}", "daemon.sock")
+
+
+DEFAULT_SOCKET = default_socket()
+
+H_BATCH = METRICS.histogram("daemon_batch_segments", "Segmente pro gebündeltem Engine-Aufruf", DEPTH_BUCKETS)
+H_CLIENTS = METRICS.histogram("daemon_batch_clients", "Clients pro gebündeltem Engine-Aufruf", DEPTH_BUCKETS)
+
+_FRAME = struct.Struct("!II")
+
+
+def add_parser(sub):
+    p = sub.add_parser("daemon", help="Modell als gemeinsamen Dienst für lokale Clients bereitstellen")
+    p.add_argument("--socket", help="Pfad des Unix-Sockets (Standard: daemon.socket bzw. %s)" % default_socket())
+    p.add_argument("--device", help="Überschreibt device aus der Config")
+    p.add_argument("--model", help="Überschreibt model aus der Config")
+    return p
+
+
+# --- Protokoll -------------------------------------------------------------
+
+def _recv_exact(sock, n):
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        k = sock.recv_into(view[got:])
+        if not k:
+            raise ConnectionError("Verbindung geschlossen")
+        got += k
+    return bytes(buf)
+
+
+def peer_uid(sock):
+    """Benutzer des Prozesses am anderen Ende (None, wenn das System es nicht verrät)"""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", creds)[1]
+
+
+def trusted_uids(users):
+    """daemon.trusted_users (Namen oder UIDs) → UIDs"""
+    import pwd
+    return {u if isinstance(u, int) else pwd.getpwnam(u).pw_uid for u in users or ()}
+
+
+def _owned_dir(path, mode):
+    # Verzeichnis des Sockets: uns gehörend, für andere nicht beschreibbar –
+    # sonst könnte ein fremder Benutzer den Socket austauschen
+    os.makedirs(path, mode=mode, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.geteuid():
+        raise PermissionError(f"{path} gehört nicht dem aktuellen Benutzer")
+    if st.st_mode & 0o022:
+        raise PermissionError(f"{path} ist für andere beschreibbar")
+    os.chmod(path, mode)
+
+
+def send_message(sock, header, payload=b""):
+    data = json.dumps(header).encode("utf-8")
+    sock.sendall(_FRAME.pack(len(data), len(payload)) + data + payload)
+
+
+def recv_message(sock):
+    hlen, plen = _FRAME.unpack(_recv_exact(sock, _FRAME.size))
+    header = json.loads(_recv_exact(sock, hlen))
+    payload = _recv_exact(sock, plen) if plen else b""
+    return header, payload
+
+
+def _pack_audio(audios):
+    audios = [np.ascontiguousarray(a, dtype=np.float32) for a in audios]
+    return [len(a) for a in audios], b"".join(a.tobytes() for a in audios)
+
+
+def _unpack_audio(lengths, payload):
+    data = np.frombuffer(payload, dtype=np.float32)
+    out, pos = [], 0
+    for n in lengths:
+        out.append(data[pos:pos + n])
+        pos += n
+    return out
+
+
+def _to_dict(r):
+    return {"text": r.text, "words": r.words, "segments": r.segments}
+
+
+def _from_dict(d):
+    return Transcript(d["text"], [tuple(w) for w in d["words"]], [tuple(s) for s in d["segments"]])
+
+
+# --- Client ----------------------------------------------------------------
+
+class Client:
+    """Verbindung zum Daemon; ein Request zur Zeit (STTWorker ist ein Thread)"""
+
+    def __init__(self, path=DEFAULT_SOCKET, trusted_uids=()):
+        self.path = path
+        # Daemon-Benutzer, denen Audio geschickt werden darf (eigener und root immer)
+        self.trusted = {os.geteuid(), 0, *trusted_uids}
+        self.sock = None
+        self._lock = threading.Lock()
+        self._seq = 0
+        self.info = {}
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+            uid = peer_uid(sock)
+            if uid is None:
+                uid = os.stat(self.path).st_uid
+            if uid not in self.trusted:
+                raise PermissionError(f"{self.path} gehört einem fremden Benutzer (uid {uid})")
+            send_message(sock, {"op": "hello", "pid": os.getpid()})
+            info, _ = recv_message(sock)
+        except BaseException:
+            sock.close()
+            raise
+        if info.get("error"):
+            sock.close()
+            raise PermissionError(f"Daemon: {info['error']}")
+        self.sock = sock
+        self.info = info
+        return info
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+    def request(self, audios, language=None, prompt=None, word_timestamps=False):
+        lengths, payload = _pack_audio(audios)
+        with self._lock:
+            self._seq += 1
+            header = {"op": "transcribe", "id": self._seq, "lengths": lengths, "language": language,
+                      "prompt": prompt, "word_timestamps": word_timestamps}
+            for attempt in (0, 1):
+                try:
+                    if self.sock is None:
+                        self.connect()
+                    send_message(self.sock, header, payload)
+                    reply, _ = recv_message(self.sock)
+                    break
+                except (ConnectionError, OSError):
+                    # Daemon neu gestartet: einmal neu verbinden
+                    self.close()
+                    if attempt:
+                        raise
+        if reply.get("error"):
+            raise RuntimeError(f"Daemon: {reply['error']}")
+        return [_from_dict(d) for d in reply["results"]]
+
+
+# --- Server ----------------------------------------------------------------
+
+class _Request:
+    def __init__(self, session, header, audios):
+        self.session = session
+        self.id = header["id"]
+        self.language = header.get("language")
+        self.prompt = header.get("prompt")
+        self.word_timestamps = header.get("word_timestamps", False)
+        self.audios = audios
+
+    @property
+    def batchable(self):
+        # Prompt und Wort-Zeitstempel gibt es nur im Einzelaufruf
+        return not self.prompt and not self.word_timestamps
+
+
+class _Session:
+    def __init__(self, sock):
+        self.sock = sock
+        self.lock = threading.Lock()
+        self.alive = True
+
+    def reply(self, header):
+        with self.lock:
+            if not self.alive:
+                return
+            try:
+                send_message(self.sock, header)
+            except OSError:
+                self.alive = False
+
+
+class Daemon:
+    """Unix-Socket-Server mit einem Batcher-Thread vor der Engine.
+
+    Anfragen, die innerhalb von batch_ms eintreffen, werden nach Sprache
+    gruppiert und gemeinsam dekodiert – aus allen Sitzungen.
+    """
+
+    def __init__(self, engine, path=DEFAULT_SOCKET, batch_ms=20, shared=False):
+        self.engine = engine
+        self.path = path
+        self.batch_wait = batch_ms / 1000.0
+        self.shared = shared
+        self.requests = queue.Queue()
+        self.sessions = set()
+        self.running = True
+        self.batches = 0
+        self.segments = 0
+
+    def _claim_path(self):
+        # Vorhandenen Socket nur ersetzen, wenn er verwaist und unserer ist
+        try:
+            st = os.lstat(self.path)
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(st.st_mode) or st.st_uid != os.geteuid():
+            raise RuntimeError(f"{self.path} existiert und ist kein eigener Socket")
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.remove(self.path)    # verwaister Socket eines beendeten Daemons
+            return
+        finally:
+            probe.close()
+        raise RuntimeError(f"Auf {self.path} läuft bereits ein Daemon")
+
+    def serve_forever(self):
+        # Standard: nur der eigene Benutzer; shared für mehrere Benutzer
+        _owned_dir(os.path.dirname(os.path.abspath(self.path)), 0o711 if self.shared else 0o700)
+        self._claim_path()
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.path)
+        os.chmod(self.path, 0o666 if self.shared else 0o600)
+        inode = os.lstat(self.path).st_ino
+        server.listen()
+        threading.Thread(target=self._batch_loop, daemon=True, name="daemon-batch").start()
+        try:
+            while self.running:
+                conn, _ = server.accept()
+                threading.Thread(target=self._client_loop, args=(conn,), daemon=True,
+                                 name="daemon-client").start()
+        finally:
+            server.close()
+            # Nur den eigenen Socket entfernen, nicht den eines Nachfolgers
+            try:
+                if os.lstat(self.path).st_ino == inode:
+                    os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def _authorized(self, conn):
+        if self.shared:
+            return True
+        uid = peer_uid(conn)
+        # Ohne SO_PEERCRED schützen die Dateirechte (0600, Verzeichnis 0700)
+        return uid is None or uid == os.geteuid()
+
+    def _client_loop(self, conn):
+        session = _Session(conn)
+        if not self._authorized(conn):
+            session.reply({"error": "fremder Benutzer (daemon.shared ist aus)"})
+            conn.close()
+            return
+        self.sessions.add(session)
+        try:
+            while True:
+                header, payload = recv_message(conn)
+                op = header.get("op")
+                if op == "hello":
+                    session.reply({
+                        "engine": self.engine.name,
+                        "model": self.engine.cfg.get("model"),
+                        "capabilities": self.engine.capabilities,
+                    })
+                elif op == "transcribe":
+                    audios = _unpack_audio(header["lengths"], payload)
+                    self.requests.put(_Request(session, header, audios))
+                else:
+                    session.reply({"error": f"unbekannte Operation {op!r}"})
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            session.alive = False
+            self.sessions.discard(session)
+            conn.close()
+
+    def _collect(self):
+        # Erste Anfrage abwarten, dann batch_ms lang weitere einsammeln
+        pending = [self.requests.get()]
+        deadline = time.perf_counter() + self.batch_wait
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                pending.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return pending
+
+    def _batch_loop(self):
+        while self.running:
+            pending = self._collect()
+            groups = {}
+            for req in pending:
+                if req.batchable:
+                    groups.setdefault(req.language, []).append(req)
+                else:
+                    self._run_single(req)
+            for language, reqs in groups.items():
+                self._run_batch(language, reqs)
+
+    def _run_single(self, req):
+        try:
+            results = [self.engine.transcribe(a, language=req.language, prompt=req.prompt,
+                                              word_timestamps=req.word_timestamps)
+                       for a in req.audios]
+        except Exception as e:
+            req.session.reply({"id": req.id, "error": str(e)})
+            return
+        req.session.reply({"id": req.id, "results": [_to_dict(r) for r in results]})
+
+    def _run_batch(self, language, reqs):
+        audios = [a for req in reqs for a in req.audios]
+        self.batches += 1
+        self.segments += len(audios)
+        H_BATCH.observe(len(audios))
+        H_CLIENTS.observe(len({id(req.session) for req in reqs}))
+        try:
+            if len(audios) == 1:
+                results = [self.engine.transcribe(audios[0], language=language)]
+            else:
+                results = self.engine.transcribe_batch(audios, language=language)
+        except Exception as e:
+            for req in reqs:
+                req.session.reply({"id": req.id, "error": str(e)})
+            return
+        pos = 0
+        for req in reqs:
+            n = len(req.audios)
+            req.session.reply({"id": req.id, "results": [_to_dict(r) for r in results[pos:pos + n]]})
+            pos += n
+
+
+def run(args):
+    from main import load_config, init_engine
+    from metrics import serve as serve_metrics
+    cfg = load_config(args.config)
+    # Der Daemon dekodiert die Live-Fenster seiner Clients: nur das Hauptmodell,
+    # kein Final-Modell, das ungenutzt Speicher belegt
+    cfg.pop("final", None)
+    if args.device:
+        cfg["device"] = args.device
+    if args.model:
+        cfg["model"] = args.model
+    if cfg["engine"] == "daemon":
+        print("[speakup] Daemon braucht ein echtes Backend (engine: faster-whisper/whispercpp)",
+              file=sys.stderr)
+        return 1
+
+    dcfg = cfg.get("daemon", {})
+    path = os.path.expanduser(args.socket or dcfg.get("socket") or default_socket())
+    print(f"[speakup] Lade {cfg['model']} ({cfg['engine']}, {cfg['device']})...", file=sys.stderr)
+    engine = init_engine(cfg)
+    mcfg = cfg.get("metrics", {})
+    if mcfg.get("http", False):
+        serve_metrics(METRICS, mcfg.get("host", "127.0.0.1"), mcfg.get("port", 9464))
+
+    daemon = Daemon(engine, path, batch_ms=dcfg.get("batch_ms", 20), shared=dcfg.get("shared", False))
+    print(f"[speakup] Daemon lauscht auf {path}", file=sys.stderr)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    except (RuntimeError, PermissionError) as e:
+        print(f"[speakup] {e}", file=sys.stderr)
+        return 1
+    print(f"[speakup] {daemon.batches} Batches, {daemon.segments} Segmente", file=sys.stderr)
+    return 0
@@ -0,0 +1,275 @@
+"""
+speakup - STT-Engines
+Einheitliche Schnittstelle für die Backends: laden, einzelnen Puffer oder
+Batch transkribieren, aufwärmen, Fähigkeiten abfragen.
+"""
+
+import os
+import time
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+class Transcript:
+    """Ergebnis eines Engine-Aufrufs.
+
+    words/segments sind Tupel (start, end, text) in Sekunden relativ zum
+    übergebenen Audio; leer, wenn das Backend keine Zeitstempel liefert.
+    """
+
+    def __init__(self, text, words=None, segments=None):
+        self.text = text
+        self.words = words or []
+        self.segments = segments or []
+
+    def __repr__(self):
+        return f"Transcript({self.text!r})"
+
+
+class Engine:
+    """Basisklasse für STT-Backends"""
+
+    name = None
+    # word_timestamps: liefert Wort-Zeitstempel (nötig für Streaming)
+    # batch: echte Batch-Inferenz statt Schleife
+    capabilities = {"word_timestamps": False, "batch": False, "max_batch": 1}
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.model = None
+
+    def load(self):
+        """Modell laden; gibt self zurück"""
+        raise NotImplementedError
+
+    def transcribe(self, audio, language=None, prompt=None, word_timestamps=False):
+        """float32-Audio (16 kHz mono) → Transcript"""
+        raise NotImplementedError
+
+    def transcribe_batch(self, audios, language=None):
+        """Mehrere Puffer in einem Aufruf; Standard: nacheinander"""
+        return [self.transcribe(a, language=language) for a in audios]
+
+    def warmup(self, seconds=1.0):
+        """Einmal dekodieren, damit der erste echte Aufruf nicht Kernel/Caches lädt"""
+        self.transcribe(np.zeros(int(SAMPLE_RATE * seconds), dtype=np.float32))
+
+
+class FasterWhisperEngine(Engine):
+    name = "faster-whisper"
+
+    def __init__(self, cfg):
+        super().__init__(cfg)
+        self.capabilities = {
+            "word_timestamps": True,
+            "batch": True,
+            "max_batch": cfg.get("batch_size", 8),
+        }
+
+    def load(self):
+        from faster_whisper import WhisperModel
+        kwargs = {}
+        if self.cfg.get("compute_type"):
+            kwargs["compute_type"] = self.cfg["compute_type"]
+        if self.cfg.get("cpu_threads"):
+            kwargs["cpu_threads"] = self.cfg["cpu_threads"]
+        self.model = WhisperModel(self.cfg["model"], device=self.cfg["device"], **kwargs)
+        return self
+
+    def transcribe(self, audio, language=None, prompt=None, word_timestamps=False):
+        segments, _ = self.model.transcribe(
+            audio,
+            language=language,
+            vad_filter=False,
+            condition_on_previous_text=True,
+            word_timestamps=word_timestamps,
+            initial_prompt=prompt or None,
+        )
+        words, spans = [], []
+        for s in segments:
+            spans.append((s.start, s.end, s.text))
+            if word_timestamps:
+                words.extend((w.start, w.end, w.word) for w in (s.words or []))
+        return Transcript("".join(s[2] for s in spans), words, spans)
+
+    def transcribe_batch(self, audios, language=None):
+        # Batch braucht eine feste Sprache (keine Erkennung pro Puffer)
+        if len(audios) < 2 or language is None or not self.capabilities["batch"]:
+            return super().transcribe_batch(audios, language)
+        results = []
+        step = self.capabilities["max_batch"]
+        try:
+            for i in range(0, len(audios), step):
+                results.extend(self._generate_batch(audios[i:i + step], language))
+        except Exception as e:
+            # Interna von faster-whisper/CTranslate2 unterscheiden sich je Version
+            print(f"[speakup] Batch-Inferenz nicht verfügbar ({e}) – dekodiere einzeln")
+            self.capabilities["batch"] = False
+            return super().transcribe_batch(audios, language)
+        return results
+
+    def _generate_batch(self, audios, language):
+        from faster_whisper.audio import pad_or_trim
+        from faster_whisper.tokenizer import Tokenizer
+
+        m = self.model
+        features = np.stack([pad_or_trim(m.feature_extractor(a)) for a in audios])
+        encoder_output = m.encode(features)
+        tokenizer = Tokenizer(m.hf_tokenizer, m.model.is_multilingual,
+                              task="transcribe", language=language)
+        prompt = list(tokenizer.sot_sequence) + [tokenizer.no_timestamps]
+        results = m.model.generate(encoder_output, [prompt] * len(audios),
+                                   beam_size=self.cfg.get("beam_size", 5), max_length=448)
+        return [Transcript(tokenizer.decode([t for t in r.sequences_ids[0] if t < tokenizer.eot]))
+                for r in results]
+
+
+class WhisperCppEngine(Engine):
+    name = "whispercpp"
+
+    def load(self):
+        from whispercpp import Whisper
+        self.model = Whisper(model=self.cfg["model"])  # gguf/ggml im models/
+        return self
+
+    def transcribe(self, audio, language=None, prompt=None, word_timestamps=False):
+        return Transcript(self.model.transcribe(audio, language=language or "auto"))
+
+
+class StubEngine(Engine):
+    """Deterministisches Backend ohne Modell – für Tests und Benchmarks.
+
+    Pro 0.4s-Slot mit Energie ein Wort (aus dem Signal abgeleitet), je zwei
+    Wörter ein Segment. Rechenzeit wird über stub_rtf (pro Sekunde Audio) und
+    stub_latency (fix pro Aufruf) simuliert; ein Batch kostet so viel wie
+    sein längster Puffer.
+    """
+
+    name = "stub"
+    capabilities = {"word_timestamps": True, "batch": True, "max_batch": 16}
+    SLOT = 0.4
+
+    def __init__(self, cfg):
+        super().__init__(cfg)
+        self.rtf = cfg.get("stub_rtf", 0.05)
+        self.latency = cfg.get("stub_latency", 0.0)
+        self.threshold = 0.01
+
+    def load(self):
+        self.model = "stub"
+        return self
+
+    def _decode(self, audio):
+        n = int(self.SLOT * SAMPLE_RATE)
+        words = []
+        for i in range(len(audio) // n):
+            slot = audio[i * n:(i + 1) * n]
+            rms = float(np.sqrt(np.mean(slot * slot)))
+            if rms >= self.threshold:
+                words.append((i * self.SLOT, (i + 1) * self.SLOT, f" w{int(rms * 1000) % 97}"))
+        segments = [(ws[0][0], ws[-1][1], "".join(w[2] for w in ws))
+                    for ws in (words[j:j + 2] for j in range(0, len(words), 2))]
+        return Transcript("".join(w[2] for w in words), words, segments)
+
+    def transcribe(self, audio, language=None, prompt=None, word_timestamps=False):
+        time.sleep(self.latency + self.rtf * len(audio) / SAMPLE_RATE)
+        return self._decode(audio)
+
+    def transcribe_batch(self, audios, language=None):
+        if audios:
+            time.sleep(self.latency + self.rtf * max(len(a) for a in audios) / SAMPLE_RATE)
+        return [self._decode(a) for a in audios]
+
+
+class DaemonEngine(Engine):
+    """Thin Client: dekodiert im speakup-Daemon (speakup daemon) statt lokal"""
+
+    name = "daemon"
+
+    def load(self):
+        from daemon import Client, default_socket, trusted_uids
+        dcfg = self.cfg.get("daemon", {})
+        self.model = Client(os.path.expanduser(dcfg.get("socket") or default_socket()),
+                            trusted_uids(dcfg.get("trusted_users")))
+        info = self.model.connect()
+        # Fähigkeiten des Backends im Daemon übernehmen
+        self.capabilities = dict(info["capabilities"])
+        print(f"[speakup] Verbunden mit Daemon ({info['engine']}, {info['model']})")
+        return self
+
+    def transcribe(self, audio, language=None, prompt=None, word_timestamps=False):
+        return self.model.request([audio], language, prompt, word_timestamps)[0]
+
+    def transcribe_batch(self, audios, language=None):
+        return self.model.request(audios, language)
+
+    def warmup(self, seconds=1.0):
+        pass    # Modell im Daemon ist bereits warm
+
+
+class TieredEngine(Engine):
+    """Zwei Modelle: ein kleines für schnelle Teilergebnisse (Fenster,
+    Streaming), ein großes, das abgeschlossene Äußerungen nachdekodiert.
+
+    Verhält sich nach außen wie das kleine Modell; transcribe_final() nutzt
+    das große.
+    """
+
+    def __init__(self, partial, final):
+        super().__init__(partial.cfg)
+        self.partial = partial
+        self.final = final
+        self.name = partial.name
+        self.model = partial.model
+        self.capabilities = partial.capabilities
+
+    def load(self):
+        return self
+
+    def transcribe(self, audio, language=None, prompt=None, word_timestamps=False):
+        return self.partial.transcribe(audio, language=language, prompt=prompt,
+                                       word_timestamps=word_timestamps)
+
+    def transcribe_batch(self, audios, language=None):
+        return self.partial.transcribe_batch(audios, language=language)
+
+    def transcribe_final(self, audio, language=None):
+        return self.final.transcribe(audio, language=language)
+
+    def warmup(self, seconds=1.0):
+        self.partial.warmup(seconds)
+        self.final.warmup(seconds)
+
+
+ENGINES = {
+    FasterWhisperEngine.name: FasterWhisperEngine,
+    WhisperCppEngine.name: WhisperCppEngine,
+    StubEngine.name: StubEngine,
+    DaemonEngine.name: DaemonEngine,
+}
+
+
+def create_engine(cfg):
+    """Engine-Objekt zur Config (noch nicht geladen)"""
+    try:
+        return ENGINES[cfg["engine"]](cfg)
+    except KeyError:
+        raise ValueError("Unknown engine")
+
+
+def final_config(cfg):
+    """Config des Final-Modells (final.enable) oder None.
+
+    Schlüssel im Abschnitt final (model, device, compute_type, ...)
+    überschreiben die der Haupt-Config; null übernimmt den Wert.
+    """
+    fcfg = cfg.get("final") or {}
+    if not fcfg.get("enable", False):
+        return None
+    out = dict(cfg)
+    out.update((k, v) for k, v in fcfg.items()
+               if k not in ("enable", "replace", "max_erase") and v is not None)
+    out.pop("final", None)
+    return out
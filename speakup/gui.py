@@ -6,15 +6,22 @@ Ermöglicht Start/Stop und Konfiguration über GUI
 
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext, font
+import argparse
 import threading
 import queue
+import time
 import yaml
 import os
 import sys
+from collections import deque
 from pathlib import Path
 
 # Import from main.py
-from main import App, init_engine, load_config
+from main import App, load_config, preload_model, startup_report, MODEL_CACHE, cache_key
+from metrics import METRICS
+from history import History, history_path, format_time, DEFAULT_PATH as HISTORY_PATH
+from reload import ConfigWatcher
+import profiler
 
 class SpeakupGUI:
     def __init__(self, root):
@@ -28,9 +35,14 @@ class SpeakupGUI:
         
         # State
         self.app = None
+        self.config_watcher = None
         self.config = None
         self.running = False
         self.config_path = "speakup/config.yaml"
+        # Log: beliebige Threads schreiben in die Queue, nur der Tk-Loop ins Widget
+        self.log_queue = queue.SimpleQueue()
+        self.log_lines = deque(maxlen=self.LOG_MAX_LINES)
+        self.log_shown = 0          # Zeilen im Widget
         
         # Load config
         self.load_configuration()
@@ -40,6 +52,8 @@ class SpeakupGUI:
         
         # Status update timer
         self.update_status()
+        self.update_metrics()
+        self.flush_log()
     
     def setup_modern_theme(self):
         """Configure modern theme and styling"""
@@ -103,9 +117,21 @@ class SpeakupGUI:
         """Standard-Konfiguration"""
         return {
             "hotkey": "ctrl+shift+space",
+            "history": {
+                "enable": False,
+                "path": None
+            },
             "engine": "faster-whisper",
             "model": "medium",
             "device": "cuda",
+            "final": {
+                "enable": False,
+                "model": "large-v3",
+                "device": None,
+                "compute_type": None,
+                "replace": True,
+                "max_erase": 400
+            },
             "language": "de",
             "insert_mode": "type",
             "vad": {
@@ -114,12 +140,46 @@ class SpeakupGUI:
                 "min_speech_ms": 300,
                 "max_silence_ms": 800
             },
+            "preprocess": {
+                "enable": False,
+                "noise_gate": True,
+                "noise_reduction_db": 12.0,
+                "agc": True,
+                "target_dbfs": -20.0,
+                "max_gain_db": 24.0
+            },
             "chunk": {
                 "seconds": 0.8,
-                "overlap": 0.2
+                "overlap": 0.2,
+                "buffer_seconds": 30.0,
+                "adaptive": True,
+                "min_seconds": 0.5,
+                "max_seconds": 3.0,
+                "target_rtf": 0.5
+            },
+            "queues": {
+                "audio_seconds": 10.0,
+                "memory_utterances": 4,
+                "text_max": 32
+            },
+            "record": {
+                "enable": False,
+                "dir": None,
+                "grow_seconds": 300.0
+            },
+            "output": {
+                "coalesce_ms": 30,
+                "paste_threshold": 40,
+                "restore_ms": 300
+            },
+            "metrics": {
+                "http": False,
+                "host": "127.0.0.1",
+                "port": 9464
             },
             "punctuate": True,
-            "log_transcripts": False
+            "log_transcripts": False,
+            "log_path": None
         }
     
     def create_widgets(self):
@@ -145,7 +205,10 @@ class SpeakupGUI:
         # Tab 3: Advanced
         self.create_advanced_tab(notebook)
         
-        # Tab 4: Log
+        # Tab 4: Metrics
+        self.create_metrics_tab(notebook)
+        
+        # Tab 5: Log
         self.create_log_tab(notebook)
         
         # Bottom status bar
@@ -307,7 +370,7 @@ class SpeakupGUI:
         engine_combo = ttk.Combobox(
             general_card, 
             textvariable=self.engine_var,
-            values=["faster-whisper", "whispercpp"],
+            values=["faster-whisper", "whispercpp", "daemon"],
             state="readonly",
             width=28,
             font=('Segoe UI', 10)
@@ -359,7 +422,7 @@ class SpeakupGUI:
         mode_combo = ttk.Combobox(
             general_card,
             textvariable=self.insert_mode_var,
-            values=["type", "clipboard"],
+            values=["type", "clipboard", "auto"],
             state="readonly",
             width=28,
             font=('Segoe UI', 10)
@@ -457,6 +520,15 @@ class SpeakupGUI:
             font=('Segoe UI', 10)
         ).pack(anchor=tk.W, pady=8)
         
+        # Noise-Gate + AGC vor der VAD
+        self.preprocess_var = tk.BooleanVar(value=self.config.get("preprocess", {}).get("enable", False))
+        ttk.Checkbutton(
+            vad_card,
+            text="Noise Suppression & Auto Gain",
+            variable=self.preprocess_var,
+            style='Card.TCheckbutton'
+        ).pack(anchor=tk.W, pady=(15, 8))
+        
         # Chunk Settings Card
         chunk_card = self.create_card(frame, "Chunk Settings")
         chunk_card.pack(fill=tk.X, padx=20, pady=20)
@@ -497,18 +569,149 @@ class SpeakupGUI:
             width=30
         ).pack()
     
+    def create_metrics_tab(self, notebook):
+        """Metrics Tab - Latenz pro Pipeline-Stufe, live"""
+        frame = ttk.Frame(notebook, style='Modern.TFrame')
+        notebook.add(frame, text="📈 Metrics")
+        
+        metrics_card = self.create_card(frame, "Pipeline Latency")
+        metrics_card.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
+        
+        self.metrics_text = scrolledtext.ScrolledText(
+            metrics_card,
+            height=18,
+            font=("JetBrains Mono", 10),
+            bg=self.colors['bg_tertiary'],
+            fg=self.colors['text_primary'],
+            state=tk.DISABLED,
+            relief='flat',
+            borderwidth=0
+        )
+        self.metrics_text.pack(fill=tk.BOTH, expand=True, pady=10)
+        
+        port = self.config.get("metrics", {}).get("port", 9464)
+        self.metrics_hint = ttk.Label(
+            frame,
+            text=f"Prometheus endpoint: http://127.0.0.1:{port}/metrics (metrics.http: true)",
+            style='Modern.TLabel',
+            font=('Segoe UI', 9)
+        )
+        self.metrics_hint.pack(pady=(0, 10))
+    
+    def update_metrics(self):
+        """Metrik-Snapshot in das Panel schreiben (1x pro Sekunde)"""
+        snap = METRICS.snapshot()
+        lines = [f"{'Stage':<28}{'n':>7}{'p50':>10}{'p95':>10}", "━" * 55]
+        for name, label in (
+            ("capture_to_vad_seconds", "Capture → VAD"),
+            ("vad_to_inference_seconds", "VAD → inference start"),
+            ("inference_seconds", "Inference"),
+            ("inference_to_typed_seconds", "Inference → typed"),
+            ("emit_type_seconds", "Emit (typing)"),
+            ("emit_paste_seconds", "Emit (paste)"),
+        ):
+            m = snap.get(name)
+            if not m:
+                continue
+            p50 = f"{m['p50'] * 1000:.0f} ms" if m['p50'] is not None else "-"
+            p95 = f"{m['p95'] * 1000:.0f} ms" if m['p95'] is not None else "-"
+            lines.append(f"{label:<28}{m['count']:>7}{p50:>10}{p95:>10}")
+        lines.append("")
+        for name, label in (
+            ("audio_queue_depth", "audio_q depth"),
+            ("text_queue_depth", "text_q depth"),
+        ):
+            m = snap.get(name)
+            if m and m['count']:
+                lines.append(f"{label:<28}{m['count']:>7}{m['p50']:>10.0f}{m['p95']:>10.0f}")
+        lines.append("")
+        for name, label in (
+            ("audio_queue_items", "audio_q items"),
+            ("text_queue_items", "text_q items"),
+            ("audio_queue_dropped_seconds_total", "Dropped audio (s)"),
+            ("audio_queue_spooled_total", "Spooled utterances"),
+            ("ring_overruns_total", "Ring overruns"),
+            ("window_seconds", "Window (s)"),
+            ("skipped_windows_total", "Skipped silent windows"),
+            ("saved_inference_seconds_total", "Saved inference (s)"),
+        ):
+            if name in snap:
+                lines.append(f"{label:<28}{snap[name]:>27g}")
+        
+        self.metrics_text.config(state=tk.NORMAL)
+        self.metrics_text.delete(1.0, tk.END)
+        self.metrics_text.insert(1.0, "\n".join(lines))
+        self.metrics_text.config(state=tk.DISABLED)
+        
+        self.root.after(1000, self.update_metrics)
+    
     def create_log_tab(self, notebook):
         """Log Tab - Ausgabe und Transkripte"""
         frame = ttk.Frame(notebook, style='Modern.TFrame')
         notebook.add(frame, text="📋 Logs")
         
+        # Transcript history search
+        history_card = self.create_card(frame, "Transcript History")
+        history_card.pack(fill=tk.BOTH, expand=True, padx=20, pady=(20, 0))
+        
+        search_frame = ttk.Frame(history_card, style='Card.TFrame')
+        search_frame.pack(fill=tk.X, pady=(10, 0))
+        
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=self.search_var, font=('Segoe UI', 10))
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        search_entry.bind("<Return>", lambda e: self.search_history(page=0))
+        
+        ttk.Button(
+            search_frame,
+            text="🔍 Search",
+            command=lambda: self.search_history(page=0),
+            width=10
+        ).pack(side=tk.LEFT, padx=(10, 0))
+        
+        self.history_text = scrolledtext.ScrolledText(
+            history_card,
+            height=8,
+            font=("JetBrains Mono", 9),
+            bg=self.colors['bg_tertiary'],
+            fg=self.colors['text_primary'],
+            state=tk.DISABLED,
+            relief='flat',
+            borderwidth=0,
+            wrap=tk.WORD
+        )
+        self.history_text.pack(fill=tk.BOTH, expand=True, pady=10)
+        
+        page_frame = ttk.Frame(history_card, style='Card.TFrame')
+        page_frame.pack(fill=tk.X)
+        
+        ttk.Button(
+            page_frame,
+            text="◀ Prev",
+            command=lambda: self.search_history(page=self.history_page - 1),
+            width=8
+        ).pack(side=tk.LEFT)
+        
+        self.history_page_label = ttk.Label(page_frame, text="", style='Card.TLabel')
+        self.history_page_label.pack(side=tk.LEFT, expand=True)
+        
+        ttk.Button(
+            page_frame,
+            text="Next ▶",
+            command=lambda: self.search_history(page=self.history_page + 1),
+            width=8
+        ).pack(side=tk.RIGHT)
+        
+        self.history = None
+        self.history_page = 0
+        
         # Log area
         log_card = self.create_card(frame, "System Logs")
         log_card.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
         
         self.log_text = scrolledtext.ScrolledText(
             log_card,
-            height=22,
+            height=12,
             font=("JetBrains Mono", 9),
             bg=self.colors['bg_tertiary'],
             fg=self.colors['text_primary'],
@@ -572,6 +775,7 @@ Input Mode:      {self.config.get('insert_mode')}
 VAD:             {'Enabled' if self.config['vad'].get('enable') else 'Disabled'}
 Punctuation:     {'Yes' if self.config.get('punctuate') else 'No'}
 Logging:         {'Yes' if self.config.get('log_transcripts') else 'No'}
+Resident Models: {', '.join(k[1] for k in MODEL_CACHE.keys()) or '-'}
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 """
@@ -580,21 +784,81 @@ Logging:         {'Yes' if self.config.get('log_transcripts') else 'No'}
         self.info_text.insert(1.0, info)
         self.info_text.config(state=tk.DISABLED)
     
+    # Höchstens so viele Zeilen bleiben im Log; gekürzt wird erst, wenn das
+    # Widget LOG_TRIM_SLACK Zeilen darüber liegt – dann in einem Rutsch
+    LOG_MAX_LINES = 2000
+    LOG_TRIM_SLACK = 200
+    LOG_FLUSH_MS = 100
+    
     def log(self, message, level="INFO"):
-        """Add message to log"""
-        timestamp = __import__('time').strftime('%H:%M:%S')
-        log_entry = f"[{timestamp}] {level}: {message}\n"
-        
-        self.log_text.config(state=tk.NORMAL)
-        self.log_text.insert(tk.END, log_entry)
-        self.log_text.see(tk.END)
-        self.log_text.config(state=tk.DISABLED)
+        """Add message to log (aus jedem Thread)"""
+        timestamp = time.strftime('%H:%M:%S')
+        self.log_queue.put(f"[{timestamp}] {level}: {message}\n")
+    
+    def flush_log(self):
+        """Log-Queue leeren: ein insert pro Takt, Kürzen en bloc"""
+        batch = []
+        try:
+            while True:
+                batch.append(self.log_queue.get_nowait())
+        except queue.Empty:
+            pass
+        if batch:
+            self.log_lines.extend(batch)
+            # Mehrzeilige Meldungen (startup_report) zählen mit allen Zeilen
+            added = sum(entry.count("\n") for entry in batch)
+            self.log_text.config(state=tk.NORMAL)
+            if added > self.LOG_MAX_LINES:
+                # Mehr als das Limit in einem Takt: nur das Ende zeigen
+                self.log_text.delete(1.0, tk.END)
+                self.log_text.insert(tk.END, "".join(self.log_lines))
+                self.log_shown = sum(entry.count("\n") for entry in self.log_lines)
+            else:
+                self.log_text.insert(tk.END, "".join(batch))
+                self.log_shown += added
+            if self.log_shown > self.LOG_MAX_LINES + self.LOG_TRIM_SLACK:
+                excess = self.log_shown - self.LOG_MAX_LINES
+                self.log_text.delete(1.0, f"{excess + 1}.0")
+                self.log_shown -= excess
+            self.log_text.see(tk.END)
+            self.log_text.config(state=tk.DISABLED)
+        self.root.after(self.LOG_FLUSH_MS, self.flush_log)
+    
+    HISTORY_PAGE_SIZE = 20
+    
+    def search_history(self, page=0):
+        """Historie durchsuchen (FTS5) und eine Seite Treffer anzeigen"""
+        path = history_path(self.config)
+        if path is None and not os.path.exists(os.path.expanduser(HISTORY_PATH)):
+            self.history_page_label.config(text="History disabled (history.enable in config)")
+            return
+        try:
+            if self.history is None:
+                # Eigene Verbindung im Tk-Thread; geschrieben wird im Log-Thread
+                self.history = History(path or HISTORY_PATH)
+            query = self.search_var.get()
+            total = self.history.count(query)
+            pages = max(1, -(-total // self.HISTORY_PAGE_SIZE))
+            page = min(max(0, page), pages - 1)
+            rows = self.history.search(query, self.HISTORY_PAGE_SIZE, page * self.HISTORY_PAGE_SIZE)
+        except Exception as e:
+            self.log(f"History search failed: {e}", "ERROR")
+            return
+        self.history_page = page
+        self.history_text.config(state=tk.NORMAL)
+        self.history_text.delete(1.0, tk.END)
+        self.history_text.insert(1.0, "\n".join(f"{format_time(end)}  {text}" for _, end, text in rows)
+                                 or "No matches")
+        self.history_text.config(state=tk.DISABLED)
+        self.history_page_label.config(text=f"{total} matches – page {page + 1}/{pages}")
     
     def clear_log(self):
         """Clear log"""
         self.log_text.config(state=tk.NORMAL)
         self.log_text.delete(1.0, tk.END)
         self.log_text.config(state=tk.DISABLED)
+        self.log_lines.clear()
+        self.log_shown = 0
         self.log("Log cleared")
     
     def save_log(self):
@@ -606,7 +870,7 @@ Logging:         {'Yes' if self.config.get('log_transcripts') else 'No'}
         )
         if filename:
             with open(filename, 'w') as f:
-                f.write(self.log_text.get(1.0, tk.END))
+                f.write("".join(self.log_lines))
             self.log(f"Log saved: {filename}")
     
     def save_settings(self):
@@ -626,6 +890,7 @@ Logging:         {'Yes' if self.config.get('log_transcripts') else 'No'}
             self.config["vad"]["aggressiveness"] = self.vad_aggr_var.get()
             self.config["vad"]["min_speech_ms"] = self.vad_min_var.get()
             self.config["vad"]["max_silence_ms"] = self.vad_max_var.get()
+            self.config.setdefault("preprocess", {})["enable"] = self.preprocess_var.get()
             
             self.config["chunk"]["seconds"] = self.chunk_sec_var.get()
             self.config["chunk"]["overlap"] = self.chunk_overlap_var.get()
@@ -636,35 +901,95 @@ Logging:         {'Yes' if self.config.get('log_transcripts') else 'No'}
             
             self.log("✓ Settings saved")
             self.update_info_display()
+            if self.running and self.app:
+                # Laufende Pipeline übernimmt die Änderungen ohne Neustart
+                self.apply_config(self.config)
+            else:
+                self.preload_in_background()
             messagebox.showinfo("Success", "Settings have been saved!")
             
         except Exception as e:
             self.log(f"✗ Error saving: {e}", "ERROR")
             messagebox.showerror("Error", f"Settings could not be saved:\n{e}")
     
+    def apply_config(self, cfg):
+        """Geänderte Einstellungen an die laufende App geben und protokollieren"""
+        plan = self.app.apply_config(cfg)
+        labels = {
+            "inplace": "applied live",
+            "output": "output updated",
+            "log": "transcript log reopened",
+            "hotkey": "hotkey re-registered",
+            "worker": "STT worker restarted",
+            "engine": "loading new model in background (current one keeps running)",
+            "restart": "takes effect after restart",
+        }
+        for level, keys in plan.items():
+            self.log(f"Config: {', '.join(keys)} – {labels[level]}")
+        if "hotkey" in plan:
+            self.status_detail.config(text=f"Hotkey: {self.app.hotkey}")
+    
+    def on_config_file_changed(self, cfg):
+        """config.yaml wurde außerhalb der GUI geändert"""
+        if not (self.running and self.app):
+            return
+        self.config = cfg
+        self.apply_config(cfg)
+        self.update_info_display()
+    
+    def preload_in_background(self):
+        """Neues Modell schon nach dem Speichern laden, damit Start sofort geht"""
+        key = cache_key(self.config)
+        if key in MODEL_CACHE:
+            return
+        cfg = dict(self.config)
+
+        def worker():
+            try:
+                preload_model(cfg)
+                self.log(f"✓ Model preloaded: {cfg['model']}")
+                self.root.after(0, self.update_info_display)
+            except Exception as e:
+                self.log(f"✗ Preload failed: {e}", "ERROR")
+
+        self.log(f"Preloading model {cfg['model']} in background...")
+        threading.Thread(target=worker, daemon=True, name="model-preload").start()
+
     def start_speakup(self):
         """Starte speakup"""
         try:
-            self.log("Initializing STT Engine...")
-            init_engine(self.config)
-            
             self.log("Starting speakup...")
-            self.app = App(self.config)
+            if cache_key(self.config) not in MODEL_CACHE:
+                self.log(f"Loading model {self.config['model']} in background...")
+            # Modell lädt im Hintergrund; Hotkey und Aufnahme sind sofort aktiv
+            self.app = App(self.config, on_ready=lambda app: self.root.after(0, self.on_engine_ready, app))
             
             # Start in thread
             self.speakup_thread = threading.Thread(
                 target=self.run_speakup_loop,
-                daemon=True
+                daemon=True,
+                name="hotkey-loop"
             )
             self.speakup_thread.start()
             
+            # Änderungen an config.yaml (auch von außen) ohne Neustart übernehmen
+            self.config_watcher = ConfigWatcher(
+                self.config_path,
+                lambda cfg: self.root.after(0, self.on_config_file_changed, cfg)
+            )
+            self.config_watcher.start()
+            
             self.running = True
             self.start_btn.config(state=tk.DISABLED)
             self.stop_btn.config(state=tk.NORMAL)
             
-            self.status_label.config(text="Running")
+            self.status_label.config(text="Loading model..." if self.app.loading else "Running")
             self.status_indicator.delete("all")
-            self.status_indicator.create_oval(2, 2, 18, 18, fill=self.colors['success'], outline="")
+            self.status_indicator.create_oval(
+                2, 2, 18, 18,
+                fill=self.colors['warning'] if self.app.loading else self.colors['success'],
+                outline=""
+            )
             self.status_detail.config(text=f"Hotkey: {self.config['hotkey']}")
             self.status_bar.config(text=f"Active - Hotkey: {self.config['hotkey']}")
             
@@ -674,6 +999,21 @@ Logging:         {'Yes' if self.config.get('log_transcripts') else 'No'}
             self.log(f"✗ Error starting: {e}", "ERROR")
             messagebox.showerror("Error", f"speakup could not be started:\n{e}")
     
+    def on_engine_ready(self, app):
+        """Modell geladen (im Tk-Thread aufgerufen)"""
+        if app is not self.app or not self.running:
+            return
+        if app.load_error:
+            self.log(f"✗ Model could not be loaded: {app.load_error}", "ERROR")
+            self.stop_speakup()
+            return
+        self.log(f"✓ Model ready: {self.config['model']}")
+        self.log(startup_report())
+        self.status_label.config(text="Running")
+        self.status_indicator.delete("all")
+        self.status_indicator.create_oval(2, 2, 18, 18, fill=self.colors['success'], outline="")
+        self.update_info_display()
+    
     def run_speakup_loop(self):
         """Run speakup hotkey loop"""
         try:
@@ -688,6 +1028,9 @@ Logging:         {'Yes' if self.config.get('log_transcripts') else 'No'}
                 if self.app.active:
                     self.app.toggle()  # Stop recording if active
                 self.app.stop_audio()
+            if self.config_watcher:
+                self.config_watcher.running = False
+                self.config_watcher = None
                 
             self.running = False
             self.start_btn.config(state=tk.NORMAL)
@@ -707,7 +1050,9 @@ Logging:         {'Yes' if self.config.get('log_transcripts') else 'No'}
     def update_status(self):
         """Periodisches Status-Update"""
         if self.running and self.app:
-            if self.app.active:
+            if self.app.loading and self.app.active:
+                self.status_detail.config(text="🎤 Recording (buffered until model is ready)...")
+            elif self.app.active:
                 self.status_detail.config(text="🎤 Recording...")
             else:
                 self.status_detail.config(text=f"Ready - Hotkey: {self.config['hotkey']}")
@@ -725,8 +1070,11 @@ Logging:         {'Yes' if self.config.get('log_transcripts') else 'No'}
             self.root.destroy()
 
 
-def main():
+def main(argv=None):
     """Hauptfunktion"""
+    parser = argparse.ArgumentParser(prog="speakup-gui", description="speakup GUI")
+    profiler.add_arguments(parser)
+    profiler.from_args(parser.parse_args(argv))
     root = tk.Tk()
     app = SpeakupGUI(root)
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
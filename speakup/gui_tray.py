@@ -5,19 +5,16 @@ Ermöglicht Minimierung in System Tray
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import messagebox
+import argparse
+import importlib.util
 import threading
-import yaml
 from gui import SpeakupGUI
-from main import App, init_engine, load_config
+import profiler
 
-# Optional: pystray für System Tray
-try:
-    from pystray import Icon, Menu, MenuItem
-    from PIL import Image, ImageDraw
-    TRAY_AVAILABLE = True
-except ImportError:
-    TRAY_AVAILABLE = False
+# Optional: pystray für System Tray – nur prüfen, ob vorhanden; importiert
+# wird erst beim Anlegen des Icons (pystray/PIL kosten beim Start Zeit)
+TRAY_AVAILABLE = all(importlib.util.find_spec(m) for m in ("pystray", "PIL"))
 
 
 class SpeakupGUIWithTray(SpeakupGUI):
@@ -29,12 +26,15 @@ class SpeakupGUIWithTray(SpeakupGUI):
         self.minimized_to_tray = False
         
         if TRAY_AVAILABLE:
-            self.setup_tray()
+            # Icon erst nach dem ersten Zeichnen des Fensters anlegen
+            self.root.after(0, self.setup_tray)
             # Override close behavior
             self.root.protocol("WM_DELETE_WINDOW", self.minimize_to_tray)
         
     def setup_tray(self):
         """Erstelle System Tray Icon"""
+        from pystray import Icon, Menu, MenuItem
+
         # Create icon image
         icon_image = self.create_tray_icon()
         
@@ -56,6 +56,8 @@ class SpeakupGUIWithTray(SpeakupGUI):
     
     def create_tray_icon(self):
         """Erstelle Icon-Bild für Tray"""
+        from PIL import Image, ImageDraw
+
         # Einfaches Mikrofon-Icon
         width = 64
         height = 64
@@ -72,13 +74,13 @@ class SpeakupGUIWithTray(SpeakupGUI):
     
     def minimize_to_tray(self):
         """Minimiere zu System Tray"""
-        if TRAY_AVAILABLE and not self.minimized_to_tray:
+        if self.tray_icon is not None and not self.minimized_to_tray:
             self.root.withdraw()
             self.minimized_to_tray = True
             
             # Start tray icon in thread
             if not self.tray_icon._running:
-                threading.Thread(target=self.tray_icon.run, daemon=True).start()
+                threading.Thread(target=self.tray_icon.run, daemon=True, name="tray").start()
             
             self.log("Minimiert in System Tray")
         else:
@@ -121,8 +123,11 @@ class SpeakupGUIWithTray(SpeakupGUI):
             self.root.destroy()
 
 
-def main():
+def main(argv=None):
     """Hauptfunktion"""
+    parser = argparse.ArgumentParser(prog="speakup-gui", description="speakup GUI mit System Tray")
+    profiler.add_arguments(parser)
+    profiler.from_args(parser.parse_args(argv))
     root = tk.Tk()
     
     if TRAY_AVAILABLE:
@@ -0,0 +1,146 @@
+"""
+speakup - Durchsuchbare Transkript-Historie
+SQLite mit FTS5-Volltextindex. Befüllt wird sie vom Schreib-Thread des
+TranscriptLog (eine Transaktion pro Batch), gelesen von der GUI und von
+`speakup search`. WAL-Modus: Suchen blockieren das Schreiben nicht.
+"""
+
+import datetime
+import json
+import os
+import sqlite3
+import sys
+
+DEFAULT_PATH = "~/.local/share/speakup/history.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    id INTEGER PRIMARY KEY,
+    start REAL,
+    end REAL,
+    latency REAL,
+    engine TEXT,
+    model TEXT,
+    audio TEXT,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transcripts_end ON transcripts(end);
+CREATE VIRTUAL TABLE IF NOT EXISTS transcripts_fts USING fts5(
+    text, content='transcripts', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS transcripts_ai AFTER INSERT ON transcripts BEGIN
+    INSERT INTO transcripts_fts(rowid, text) VALUES (new.id, new.text);
+END;
+"""
+
+
+def fts_query(text):
+    """Freitext → FTS5-Ausdruck: alle Wörter (als Präfix), Sonderzeichen entschärft"""
+    words = text.split()
+    return " ".join('"' + w.replace('"', '""') + '"*' for w in words)
+
+
+class History:
+    """Verbindung zur Historie; eine Instanz pro Thread (sqlite3-Regel)"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = os.path.expanduser(path)
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self.db = sqlite3.connect(self.path, timeout=5.0)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def add(self, records):
+        """Batch von TranscriptLog-Einträgen in einer Transaktion einfügen"""
+        rows = [(r.get("start"), r.get("end"), r.get("latency"), r.get("engine"), r.get("model"),
+                 json.dumps(r["audio"]) if r.get("audio") else None, r["text"])
+                for r in records if r.get("text")]
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO transcripts (start, end, latency, engine, model, audio, text) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def count(self, query=""):
+        if not query.strip():
+            return self.db.execute("SELECT count(*) FROM transcripts").fetchone()[0]
+        return self.db.execute("SELECT count(*) FROM transcripts_fts WHERE transcripts_fts MATCH ?",
+                               (fts_query(query),)).fetchone()[0]
+
+    def search(self, query="", limit=20, offset=0):
+        """Treffer (id, end, text) – neueste zuerst; Treffer in [eckigen Klammern]"""
+        if not query.strip():
+            return self.db.execute(
+                "SELECT id, end, text FROM transcripts ORDER BY id DESC LIMIT ? OFFSET ?",
+                (limit, offset)).fetchall()
+        return self.db.execute(
+            "SELECT t.id, t.end, snippet(transcripts_fts, 0, '[', ']', '…', 16) "
+            "FROM transcripts_fts JOIN transcripts t ON t.id = transcripts_fts.rowid "
+            "WHERE transcripts_fts MATCH ? ORDER BY t.id DESC LIMIT ? OFFSET ?",
+            (fts_query(query), limit, offset)).fetchall()
+
+    def import_log(self, reader, batch=500):
+        """Einträge eines TranscriptReader übernehmen, die neuer als die Historie sind"""
+        last = self.db.execute("SELECT max(end) FROM transcripts").fetchone()[0] or 0.0
+        records = reader.range(last + 1e-6) if last else reader.read()
+        n = 0
+        for i in range(0, len(records), batch):
+            n += self.add(records[i:i + batch])
+        return n
+
+
+def format_time(t):
+    if not t:
+        return "-"
+    return datetime.datetime.fromtimestamp(t).strftime("%Y-%m-%d %H:%M")
+
+
+def history_path(cfg):
+    """Pfad der Historie oder None, wenn abgeschaltet"""
+    hcfg = cfg.get("history", {})
+    if not hcfg.get("enable", False):
+        return None
+    return os.path.expanduser(hcfg.get("path") or DEFAULT_PATH)
+
+
+# --- CLI -------------------------------------------------------------------
+
+def add_parser(sub):
+    p = sub.add_parser("search", help="Transkript-Historie durchsuchen")
+    p.add_argument("query", nargs="*", help="Suchbegriffe (alle müssen vorkommen; Präfixe genügen)")
+    p.add_argument("-n", "--limit", type=int, default=20, help="Treffer pro Seite")
+    p.add_argument("-p", "--page", type=int, default=1, help="Seite (ab 1)")
+    p.add_argument("--db", help="Pfad der Historie (Standard: history.path bzw. %s)" % DEFAULT_PATH)
+    p.add_argument("--import-log", action="store_true",
+                   help="Vorher neue Einträge aus dem Transkript-Protokoll übernehmen")
+    return p
+
+
+def run(args):
+    from main import load_config
+    cfg = load_config(args.config)
+    path = args.db or os.path.expanduser(cfg.get("history", {}).get("path") or DEFAULT_PATH)
+    history = History(path)
+    try:
+        if args.import_log:
+            from transcripts import TranscriptReader, DEFAULT_PATH as LOG_PATH
+            n = history.import_log(TranscriptReader(cfg.get("log_path") or LOG_PATH))
+            print(f"[speakup] {n} Einträge aus dem Protokoll übernommen", file=sys.stderr)
+        query = " ".join(args.query)
+        total = history.count(query)
+        page = max(1, args.page)
+        rows = history.search(query, args.limit, (page - 1) * args.limit)
+        for _, end, text in rows:
+            print(f"{format_time(end)}  {text}")
+        pages = max(1, -(-total // args.limit))
+        print(f"[speakup] {total} Treffer – Seite {page}/{pages}", file=sys.stderr)
+    finally:
+        history.close()
+    return 0 if rows else 1
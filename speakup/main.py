@@ -1,89 +1,484 @@
-import queue, threading, time, yaml, sys, io
+import time
+_T_START = time.perf_counter()
+
+import queue, threading, yaml, sys, argparse, os, atexit, shutil, tempfile, importlib, copy, itertools
 import numpy as np
 
-# Audio
-import sounddevice as sd
-import webrtcvad
+# Audio (sounddevice, webrtcvad) und Eingabe (pynput, pyperclip) werden erst
+# bei Bedarf importiert: GUI und Hotkey stehen, bevor PortAudio/X11 geladen sind
+
+from ringbuffer import RingBuffer, SPSCRing
+from streaming import StreamingTranscriber
+from modelcache import ModelCache, cache_key
+from engines import TieredEngine, create_engine, final_config
+from preprocess import create_preprocessor
+from recorder import create_recorder
+from resample import PolyphaseResampler
+from transcripts import create_transcript_log
+from reload import ConfigWatcher, diff_config, plan_changes
+from metrics import METRICS, DEPTH_BUCKETS, serve as serve_metrics
+
+# Geladene Engines, resident über Start/Stop hinweg
+MODEL_CACHE = ModelCache()
+
+# Startzeiten in Sekunden: "import <modul>", "hotkey", "model", "warmup"
+STARTUP = {}
+
+def _import(name):
+    """Modul bei erster Benutzung importieren; Dauer landet in STARTUP"""
+    if name in sys.modules:
+        return sys.modules[name]
+    t0 = time.perf_counter()
+    module = importlib.import_module(name)
+    STARTUP[f"import {name}"] = time.perf_counter() - t0
+    return module
 
-# Hotkeys & Typing
-from pynput import keyboard
-from pynput.keyboard import Controller as KeyController, Key
-import pyperclip
+def startup_report():
+    imports = [(k[7:], v) for k, v in STARTUP.items() if k.startswith("import ")]
+    parts = [f"Imports {sum(v for _, v in imports):.2f}s ("
+             + ", ".join(f"{name} {v:.2f}s" for name, v in imports) + ")"]
+    for key, label in (("hotkey", "Hotkey bereit nach"), ("model", "Modell"), ("warmup", "Warm-up")):
+        if key in STARTUP:
+            parts.append(f"{label} {STARTUP[key]:.2f}s")
+    return "Start: " + ", ".join(parts)
+
+# Latenz pro Pipeline-Stufe (Sekunden) und Queue-Tiefen
+H_CAPTURE_VAD = METRICS.histogram("capture_to_vad_seconds", "Aufnahme bis VAD-Entscheidung (Blockende)")
+H_VAD_INFERENCE = METRICS.histogram("vad_to_inference_seconds", "VAD bis Inferenzstart (auslösender Block)")
+H_INFERENCE = METRICS.histogram("inference_seconds", "Dauer eines Engine-Aufrufs")
+H_FINAL_INFERENCE = METRICS.histogram("final_inference_seconds", "Dauer eines Aufrufs des Final-Modells")
+H_FINAL_LATENCY = METRICS.histogram("final_latency_seconds", "Äußerungsende bis finaler Text ausgegeben")
+H_TYPED = METRICS.histogram("inference_to_typed_seconds", "Inferenzende bis Text getippt")
+H_EMIT_TYPE = METRICS.histogram("emit_type_seconds", "Dauer einer Ausgabe per Tippen")
+H_EMIT_PASTE = METRICS.histogram("emit_paste_seconds", "Dauer einer Ausgabe per Clipboard-Paste")
+H_AUDIO_DEPTH = METRICS.histogram("audio_queue_depth", "Elemente in der audio_q je Abholung", DEPTH_BUCKETS)
+H_TEXT_DEPTH = METRICS.histogram("text_queue_depth", "Elemente in der text_q je Abholung", DEPTH_BUCKETS)
 
-# STT Engines
-ENGINE = None
-MODEL = None
 
 def load_config(path="speakup/config.yaml"):
     with open(path, "r", encoding="utf-8") as f:
         return yaml.safe_load(f)
 
 def init_engine(cfg):
-    global ENGINE, MODEL
-    if cfg["engine"] == "faster-whisper":
-        from faster_whisper import WhisperModel
-        MODEL = WhisperModel(cfg["model"], device=cfg["device"])
-        ENGINE = "faster-whisper"
-    elif cfg["engine"] == "whispercpp":
-        from whispercpp import Whisper
-        MODEL = Whisper(model=cfg["model"])  # gguf/ggml im models/
-        ENGINE = "whispercpp"
-    else:
-        raise ValueError("Unknown engine")
+    """Engine zur Config laden (oder aus dem Cache holen).
+
+    Mit final.enable beide Modelle als TieredEngine; sie liegen einzeln im
+    Cache, werden aber nur gemeinsam verdrängt.
+    """
+    ccfg = cfg.get("model_cache", {})
+    MODEL_CACHE.configure(memory_mb=ccfg.get("memory_mb", 0), max_models=ccfg.get("max_models", 2))
+    fcfg = final_config(cfg)
+    if fcfg is None:
+        return MODEL_CACHE.get(cache_key(cfg), lambda: create_engine(cfg).load())
+    engine, final = MODEL_CACHE.get_group([
+        (cache_key(cfg), lambda: create_engine(cfg).load()),
+        (cache_key(fcfg), lambda: create_engine(fcfg).load()),
+    ])
+    return TieredEngine(engine, final)
+
+def preload_model(cfg):
+    """Alias für init_engine – lädt in den Cache, ohne eine App umzuschalten"""
+    return init_engine(cfg)
+
+class AudioBlock:
+    """Live-Audio (float32) für die audio_q, mit VAD-Annotation"""
+    def __init__(self, samples, voiced=True):
+        self.samples = samples
+        self.voiced = voiced    # stimmhafte Frames oder laufende Äußerung
+        self.t = time.time()    # nach der VAD eingereiht
+
+class UtteranceEnd:
+    """Marker in der audio_q: VAD hat das Ende einer Äußerung erkannt.
+
+    start/end sind die Zeiten der Äußerung (Sample-Uhr), offsets die Datei
+    und Sample-Offsets in der Sitzungsaufnahme (None ohne Aufnahme).
+    """
+    def __init__(self, start=None, end=None, offsets=None):
+        self.start = start
+        self.end = end
+        self.offsets = offsets
+        self.t = time.time()
+
+class Utterance(UtteranceEnd):
+    """Von der VAD abgeschlossene Äußerung (float32) – eigenes Segment"""
+    def __init__(self, samples, start=None, end=None, offsets=None):
+        super().__init__(start, end, offsets)
+        self._samples = samples
+        self.path = None        # gesetzt, solange das Audio auf der Platte liegt
+
+    @property
+    def samples(self):
+        if self.path:
+            self._samples = np.fromfile(self.path, dtype=np.float32)
+            os.remove(self.path)
+            self.path = None
+        return self._samples
+
+    def spool(self, path):
+        self._samples.tofile(path)
+        self.path = path
+        self._samples = None
+
+class AudioQueue(queue.Queue):
+    """Begrenzte audio_q; put() blockiert nie.
+
+    Laufendes Audio über max_seconds verdrängt die ältesten AudioBlocks –
+    veraltete Teilfenster sind nach einem Stau nichts mehr wert.
+    Abgeschlossene Äußerungen gehen nie verloren: über max_utterances
+    hinaus werden sie auf die Platte ausgelagert und beim Dekodieren
+    wieder gelesen.
+    """
+    def __init__(self, max_seconds=10.0, max_utterances=4, spool_dir=None, sample_rate=16000):
+        self.max_samples = int(max_seconds * sample_rate)
+        self.max_utterances = max_utterances
+        self.spool_dir = spool_dir
+        self.sample_rate = sample_rate
+        super().__init__()
+
+    def _init(self, maxsize):
+        super()._init(maxsize)
+        self.block_samples = 0      # Samples in gepufferten AudioBlocks
+        self.utterances = 0         # Äußerungen im Speicher
+        self.max_depth = 0
+        self.dropped_blocks = 0
+        self.dropped_samples = 0
+        self.spooled = 0
+        self._spool_seq = 0
+
+    @property
+    def dropped_seconds(self):
+        return self.dropped_samples / self.sample_rate
+
+    def _put(self, item):
+        if isinstance(item, AudioBlock):
+            n = len(item.samples)
+            while self.block_samples + n > self.max_samples and self._drop_oldest_block():
+                pass
+            self.block_samples += n
+        elif isinstance(item, Utterance):
+            if self.utterances >= self.max_utterances:
+                item.spool(self._spool_path())
+                self.spooled += 1
+            else:
+                self.utterances += 1
+        self._append(item)
+        self.max_depth = max(self.max_depth, self._qsize())
+
+    def _get(self):
+        item = self._popleft()
+        if isinstance(item, AudioBlock):
+            self.block_samples -= len(item.samples)
+        elif isinstance(item, Utterance) and not item.path:
+            self.utterances -= 1
+        return item
+
+    def _append(self, item):
+        self.queue.append(item)
+
+    def _popleft(self):
+        return self.queue.popleft()
+
+    def _remove(self, index):
+        del self.queue[index]
+
+    def _drop_oldest_block(self):
+        for i, item in enumerate(self.queue):
+            if isinstance(item, AudioBlock):
+                self._remove(i)
+                n = len(item.samples)
+                self.block_samples -= n
+                self.dropped_blocks += 1
+                self.dropped_samples += n
+                return True
+        return False
+
+    def _spool_path(self):
+        if not self.spool_dir:
+            self.spool_dir = tempfile.mkdtemp(prefix="speakup-spool-")
+            atexit.register(shutil.rmtree, self.spool_dir, True)
+        else:
+            os.makedirs(self.spool_dir, exist_ok=True)
+        self._spool_seq += 1
+        return os.path.join(self.spool_dir, f"{self._spool_seq:08d}.f32")
+
+class Text(str):
+    """Text für die text_q; t = Ende der Inferenz (time.time()).
+
+    utterance: laufende Nummer der Äußerung, wenn das Final-Modell den Text
+    später ersetzen darf (sonst None)
+    """
+    def __new__(cls, text, t=None, utterance=None):
+        obj = super().__new__(cls, text)
+        obj.t = time.time() if t is None else t
+        obj.utterance = utterance
+        return obj
+
+class Final(Text):
+    """Ergebnis des Final-Modells; ersetzt die Teilergebnisse der Äußerung.
+
+    end_t: Wall-Clock des Äußerungsendes (für die Latenz des Final-Tiers)
+    """
+    def __new__(cls, text, utterance, end_t, t=None):
+        obj = super().__new__(cls, text, t, utterance)
+        obj.end_t = end_t
+        return obj
 
 class Typer:
-    def __init__(self, mode="type"):
-        self.kb = KeyController()
-        self.mode = mode
+    def __init__(self, mode="type", paste_threshold=40, restore_ms=300):
+        self._kb = None
+        self.mode = mode                        # type | clipboard | auto
+        self.paste_threshold = paste_threshold  # auto: ab so vielen Zeichen einfügen
+        self.restore_delay = restore_ms / 1000.0
+
+    def choose(self, text):
+        if self.mode == "auto":
+            return "clipboard" if len(text) >= self.paste_threshold else "type"
+        return self.mode
+
+    @property
+    def kb(self):
+        # pynput erst bei der ersten Ausgabe (Benchmark/Daemon ohne Tastatur)
+        if self._kb is None:
+            self._kb = _import("pynput.keyboard").Controller()
+        return self._kb
 
     def emit(self, text):
-        if not text: return
-        if self.mode == "type":
-            # Simuliertes Tippen – sicher für „jedes Textfeld"
-            self.kb.type(text)
-        else:
-            # Clipboard + Paste (schneller, aber überschreibt Zwischenablage)
-            old = pyperclip.paste()
+        """Text ausgeben; gibt den benutzten Modus zurück"""
+        if not text: return None
+        mode = self.choose(text)
+        if mode == "clipboard":
+            pyperclip = _import("pyperclip")
             try:
-                pyperclip.copy(text)
-                self.kb.press(Key.ctrl); self.kb.press('v')
-                self.kb.release('v'); self.kb.release(Key.ctrl)
-            finally:
+                self._paste(text)
+                return mode
+            except pyperclip.PyperclipException:
+                if self.mode != "auto":
+                    raise
+                # Kein Clipboard-Backend (xclip/xsel) – auto fällt auf Tippen zurück
+                print("[speakup] Zwischenablage nicht verfügbar – tippe stattdessen")
+                self.mode = "type"
+        # Simuliertes Tippen – sicher für „jedes Textfeld"
+        self.kb.type(text)
+        return "type"
+
+    def erase(self, n):
+        """n Zeichen vor dem Cursor löschen (Teilergebnisse ersetzen)"""
+        Key = _import("pynput.keyboard").Key
+        for _ in range(n):
+            self.kb.press(Key.backspace)
+            self.kb.release(Key.backspace)
+
+    def _paste(self, text):
+        # Clipboard + Paste (schneller, aber überschreibt Zwischenablage)
+        pyperclip = _import("pyperclip")
+        Key = _import("pynput.keyboard").Key
+        old = pyperclip.paste()
+        try:
+            pyperclip.copy(text)
+            self.kb.press(Key.ctrl); self.kb.press('v')
+            self.kb.release('v'); self.kb.release(Key.ctrl)
+        finally:
+            # Die Ziel-Anwendung liest die Zwischenablage erst, wenn sie das
+            # Ctrl+V verarbeitet – zu frühes Zurücksetzen fügt den alten Inhalt ein
+            time.sleep(self.restore_delay)
+            # Hat inzwischen jemand anderes kopiert, dessen Inhalt nicht überschreiben
+            if pyperclip.paste() == text:
                 pyperclip.copy(old)
 
+class OutputWorker(threading.Thread):
+    """Gibt Text aus der text_q in einem eigenen Thread aus.
+
+    Was während einer Ausgabe nachläuft, wird zu einem Emit zusammengefasst:
+    ein langer Paste statt vieler kurzer Tipp-Vorgänge.
+
+    Zweistufig (final.enable): getippte Teilergebnisse mit Äußerungsnummer
+    bleiben offen, bis das Final der Äußerung kommt. Dann wird ab ihrem
+    ersten Teilergebnis gelöscht, das Final getippt und später getippter
+    Text der nächsten Äußerung erneut ausgegeben – höchstens max_erase
+    Zeichen, sonst bleibt das Teilergebnis stehen.
+    """
+    def __init__(self, text_q, typer, coalesce_ms=30, max_erase=400):
+        super().__init__(daemon=True, name="OutputWorker")
+        self.text_q = text_q
+        self.typer = typer
+        self.coalesce = coalesce_ms / 1000.0
+        self.max_erase = max_erase
+        self.running = True
+        self.emits = 0
+        self.fragments = 0
+        self.open = []          # [(äußerung, text)] getippt, noch ohne Final
+        self.replaced = 0
+        self.replace_skipped = 0
+
+    def _collect(self):
+        try:
+            items = [self.text_q.get(timeout=0.2)]
+        except queue.Empty:
+            return []
+        # Kurz auf direkt folgende Fragmente warten (Batch-Ergebnisse)
+        deadline = time.time() + self.coalesce
+        while True:
+            try:
+                items.append(self.text_q.get_nowait())
+            except queue.Empty:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return items
+                time.sleep(min(remaining, 0.005))
+
+    def run(self):
+        while self.running:
+            items = self._collect()
+            if not items:
+                continue
+            H_TEXT_DEPTH.observe(len(items))
+            texts = []
+            for item in items:
+                if isinstance(item, Final):
+                    # Reihenfolge halten: erst alles davor tippen
+                    self._type(texts)
+                    texts = []
+                    self._replace(item)
+                else:
+                    texts.append(item)
+            self._type(texts)
+
+    def _type(self, items):
+        if not items:
+            return
+        t0 = time.time()
+        mode = self.typer.emit(" ".join(items) + " ")
+        done = time.time()
+        (H_EMIT_PASTE if mode == "clipboard" else H_EMIT_TYPE).observe(done - t0)
+        for text in items:
+            H_TYPED.observe(done - getattr(text, "t", t0))
+            if getattr(text, "utterance", None) is not None:
+                self.open.append((text.utterance, str(text)))
+        self.emits += 1
+        self.fragments += len(items)
+
+    def _replace(self, final):
+        uid = final.utterance
+        # Ab dem ersten Teilergebnis dieser (oder einer späteren) Äußerung
+        idx = next((i for i, (u, _) in enumerate(self.open) if u >= uid), len(self.open))
+        own = [s for u, s in self.open[idx:] if u == uid]
+        tail = [(u, s) for u, s in self.open[idx:] if u != uid]
+        if " ".join(own) != final:
+            # Jeder Text wurde mit einem Leerzeichen dahinter getippt
+            erase = sum(len(s) + 1 for _, s in self.open[idx:])
+            if erase > self.max_erase:
+                self.replace_skipped += 1
+            else:
+                self.typer.erase(erase)
+                retype = " ".join(t for t in [final] + [s for _, s in tail] if t)
+                if retype:
+                    self.typer.emit(retype + " ")
+                self.replaced += 1
+        H_FINAL_LATENCY.observe(time.time() - final.end_t)
+        # Finals kommen in Reihenfolge: Älteres wird nie mehr ersetzt
+        self.open = tail
+
 class VADStream:
+    # Unterhalb ~5 Frames (100 ms) pro Block ist webrtcvad pro Frame billiger
+    # als der numpy-Overhead des Vorfilters
+    PREGATE_MIN_FRAMES = 5
+
     def __init__(self, cfg, samplerate=16000, block_ms=20):
-        self.vad = webrtcvad.Vad(cfg["vad"]["aggressiveness"])
-        self.enabled = cfg["vad"]["enable"]
+        self.vad = _import("webrtcvad").Vad()
         self.samplerate = samplerate
         self.block = int(samplerate * block_ms / 1000)
-        self.min_speech = cfg["vad"]["min_speech_ms"] / 1000.0
-        self.max_silence = cfg["vad"]["max_silence_ms"] / 1000.0
-        self.buffer = io.BytesIO()
         self.in_speech = False
         self.last_voice = 0.0
         self.start_time = None
+        self.configure(cfg)
+        self.noise_floor = None     # mittlere Energie (RMS²) der Stille
+        self.voiced_frames = 0      # stimmhafte Frames im letzten process()
+        self._rest = np.zeros(0, dtype=np.int16)
+        self.frames_total = 0
+        self.frames_gated = 0
+
+    def configure(self, cfg):
+        """VAD-Einstellungen übernehmen (auch im laufenden Betrieb)"""
+        vcfg = cfg["vad"]
+        self.vad.set_mode(vcfg["aggressiveness"])
+        self.enabled = vcfg["enable"]
+        self.min_speech = vcfg["min_speech_ms"] / 1000.0
+        self.max_silence = vcfg["max_silence_ms"] / 1000.0
+        # Energie-Vorfilter: Frames klar unter dem Rauschboden gar nicht erst
+        # an webrtcvad geben
+        self.pregate = vcfg.get("pregate", True)
+        self.pregate_margin = vcfg.get("pregate_margin", 2.0)
+
+    def reset(self):
+        """Neue Aufnahme: laufende Äußerung verwerfen (Rauschboden bleibt)"""
+        self.in_speech = False
+        self.last_voice = 0.0
+        self.start_time = None
+        self.voiced_frames = 0
+        self._rest = np.zeros(0, dtype=np.int16)
+
+    def gate(self, frames):
+        """Maske der Frames, die webrtcvad sehen muss (vektorisiert über den Block)"""
+        x = frames.astype(np.float32)
+        # Mittlere Energie pro Frame (RMS²) – ohne sqrt, verglichen wird quadratisch
+        energy = np.einsum('ij,ij->i', x, x) / frames.shape[1]
+        lo = max(float(energy.min()), 1.0)
+        if self.noise_floor is None:
+            self.noise_floor = lo
+        if self.in_speech:
+            # Während Sprache alles prüfen – leise Endsilben nicht abschneiden
+            return np.ones(len(frames), dtype=bool)
+
+        # Rauschboden: fällt sofort, steigt langsam (nur außerhalb von Sprache)
+        if lo < self.noise_floor:
+            self.noise_floor = lo
+        else:
+            self.noise_floor += 0.02 * (lo - self.noise_floor)
+
+        threshold = self.noise_floor * self.pregate_margin ** 2
+        candidates = energy >= threshold
+        # Rauschen knapp über dem Boden mit hoher Nulldurchgangsrate (Zischen)
+        # ebenfalls überspringen
+        near = candidates & (energy < 4 * threshold)
+        if near.any():
+            f = frames[near]
+            zcr = np.count_nonzero((f[:, 1:] ^ f[:, :-1]) < 0, axis=1) / frames.shape[1]
+            candidates[np.flatnonzero(near)[zcr > 0.5]] = False
+        return candidates
 
     def process(self, pcm16, tnow):
         if not self.enabled:
             # VAD aus → kontinuierlich aufnehmen
-            self.buffer.write(pcm16.tobytes())
             return False, False
 
         # webrtcvad erwartet 16-bit mono bytes per 10/20/30ms
-        # hier chunkieren:
-        bytes_ = pcm16.tobytes()
+        # hier chunkieren; angefangene Frames für den nächsten Block aufheben
+        samples = pcm16.reshape(-1)
+        if len(self._rest):
+            samples = np.concatenate([self._rest, samples])
+        n = len(samples) // self.block
+        # Kopie: samples kann ein wiederverwendeter Puffer des Aufrufers sein
+        self._rest = samples[n * self.block:].copy()
+        frames = samples[:n * self.block].reshape(n, self.block)
+        self.frames_total += n
+
         voiced = False
-        for i in range(0, len(bytes_), self.block*2):
-            frame = bytes_[i:i+self.block*2]
-            if len(frame) < self.block*2: break
-            if self.vad.is_speech(frame, self.samplerate):
-                voiced = True
-                self.last_voice = tnow
-                if not self.in_speech:
-                    self.in_speech = True
-                    self.start_time = tnow
-            self.buffer.write(frame)
+        self.voiced_frames = 0
+        if n:
+            if self.pregate and n >= self.PREGATE_MIN_FRAMES:
+                candidates = np.flatnonzero(self.gate(frames))
+                self.frames_gated += n - len(candidates)
+            else:
+                candidates = range(n)
+            for i in candidates:
+                if self.vad.is_speech(frames[i].tobytes(), self.samplerate):
+                    voiced = True
+                    self.voiced_frames += 1
+                    self.last_voice = tnow
+                    if not self.in_speech:
+                        self.in_speech = True
+                        # Beginn des Frames, nicht Ende des Blocks
+                        self.start_time = tnow - (len(samples) - i * self.block) / self.samplerate
 
         start_event = False
         end_event = False
@@ -99,93 +494,873 @@ class VADStream:
 
         return start_event, end_event
 
-    def pop_bytes(self):
-        data = self.buffer.getvalue()
-        self.buffer = io.BytesIO()
-        return data
+class WindowController:
+    """Regelt die Fensterlänge nach dem gemessenen Echtzeitfaktor.
+
+    RTF = Dekodierzeit / neu hinzugekommenes Audio. Liegt der gleitende
+    Mittelwert über target_rtf, wächst das Fenster (weniger Aufrufe, die
+    fixen Kosten pro Aufruf verteilen sich); liegt er deutlich darunter,
+    schrumpft es wieder Richtung min_seconds – kürzere Fenster, weniger Latenz.
+    """
+
+    GROW = 1.25
+    SHRINK = 0.9
+
+    def __init__(self, seconds, min_seconds, max_seconds, target_rtf=0.5, enable=True):
+        self.rtf = None         # gleitender Mittelwert
+        self.adjustments = 0
+        self.base_seconds = None
+        self.configure(seconds, min_seconds, max_seconds, target_rtf, enable)
+
+    def configure(self, seconds, min_seconds, max_seconds, target_rtf=0.5, enable=True):
+        """Grenzen setzen; die geregelte Länge bleibt, solange seconds gleich ist"""
+        if seconds != self.base_seconds or not enable:
+            self.base_seconds = seconds
+            self.seconds = seconds
+        self.min_seconds = min(min_seconds, seconds)
+        self.max_seconds = max(max_seconds, seconds)
+        self.seconds = min(max(self.seconds, self.min_seconds), self.max_seconds)
+        self.target_rtf = target_rtf
+        self.enable = enable
+
+    def update(self, decode_seconds, audio_seconds):
+        """Messung eintragen; gibt die (ggf. neue) Fensterlänge zurück"""
+        if audio_seconds <= 0:
+            return self.seconds
+        rtf = decode_seconds / audio_seconds
+        self.rtf = rtf if self.rtf is None else 0.7 * self.rtf + 0.3 * rtf
+        if not self.enable:
+            return self.seconds
+
+        seconds = self.seconds
+        if self.rtf > self.target_rtf:
+            seconds = min(self.max_seconds, seconds * self.GROW)
+        elif self.rtf < 0.5 * self.target_rtf:
+            seconds = max(self.min_seconds, seconds * self.SHRINK)
+        if seconds != self.seconds:
+            self.seconds = seconds
+            self.adjustments += 1
+        return self.seconds
+
+class FinalWorker(threading.Thread):
+    """Dekodiert abgeschlossene Äußerungen mit dem Final-Modell nach.
+
+    Eigener Thread: das große Modell hält die Teilergebnisse nicht auf.
+    Mit replace geht das Ergebnis als Final in die text_q, sonst nur ins
+    Transkript-Protokoll.
+    """
+    def __init__(self, stt, replace=True):
+        super().__init__(daemon=True, name="FinalWorker")
+        self.stt = stt
+        self.replace = replace
+        self.q = queue.SimpleQueue()
+        self._pending = 0               # eingereiht oder in Arbeit
+        self._lock = threading.Lock()   # submit und run laufen in verschiedenen Threads
+        self.decoded = 0
+        self.decode_seconds = 0.0       # Summe der Aufrufe
+        self.latency_seconds = 0.0      # Summe Äußerungsende → Ergebnis
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def submit(self, utterance, uid):
+        with self._lock:
+            self._pending += 1
+        self.q.put((utterance, uid))
+
+    def close(self):
+        self.q.put(None)    # Anstehende Äußerungen werden noch dekodiert
+
+    def run(self):
+        while True:
+            item = self.q.get()
+            if item is None:
+                return
+            try:
+                self._decode(*item)
+            finally:
+                with self._lock:
+                    self._pending -= 1
+
+    def _decode(self, utterance, uid):
+        engine = self.stt.engine
+        if not hasattr(engine, "transcribe_final"):
+            return      # inzwischen auf ein Modell umgestellt
+        t0 = time.perf_counter()
+        try:
+            r = engine.transcribe_final(utterance.samples, language=self.stt.lang)
+        except Exception as e:
+            print(f"[speakup] Final-Modell fehlgeschlagen, Teilergebnis bleibt: {e}")
+            return
+        dt = time.perf_counter() - t0
+        H_FINAL_INFERENCE.observe(dt)
+        self.decoded += 1
+        self.decode_seconds += dt
+        self.latency_seconds += time.time() - utterance.t
+        text = r.text.strip()
+        self.stt._log(utterance, text, engine.final)
+        if self.replace:
+            try:
+                self.stt.out_q.put(Final(text, uid, utterance.t), timeout=5.0)
+            except queue.Full:
+                print("[speakup] text_q voll – Final verworfen, Teilergebnis bleibt")
 
 class STTWorker(threading.Thread):
-    def __init__(self, cfg, audio_q, out_q):
-        super().__init__(daemon=True)
+    # Äußerungsnummern über Worker-Neustarts hinweg eindeutig: Finals eines
+    # beendeten Workers dürfen nur dessen Teilergebnisse ersetzen
+    _utterances = itertools.count()
+
+    def __init__(self, cfg, audio_q, out_q, engine, transcript_log=None):
+        super().__init__(daemon=True, name="STTWorker")
         self.cfg = cfg
         self.audio_q = audio_q
         self.out_q = out_q
+        self.engine = engine
+        self.transcript_log = transcript_log
         self.running = True
+        self.draining = False   # bis die audio_q leer ist weiterlaufen, dann enden
+        self.streaming = cfg.get("streaming", {}).get("enable", False)
+        if self.streaming and not engine.capabilities["word_timestamps"]:
+            # Ohne Wort-Zeitstempel kein Local Agreement → Fenster-Modus
+            print(f"[speakup] Streaming nicht möglich mit {engine.name} – nutze Fenster-Modus")
+            self.streaming = False
+        self.tentative = ""
+
+        self.skipped_windows = 0
+        self.skipped_audio_seconds = 0.0
+        self.saved_inference_seconds = 0.0   # geschätzt aus der mittleren Dekodierzeit
+        self.decode_seconds = 0.0            # gleitender Mittelwert pro Aufruf
+        self.last_decode_seconds = 0.0
+        self.output_stalls = 0
+        self._trigger_t = None      # VAD-Zeit des Blocks, der die nächste Inferenz auslöst
+
+        # Zweistufig: Äußerungen gehen an das Final-Modell, Teilergebnisse
+        # tragen die Nummer der laufenden Äußerung
+        self.final = None
+        if hasattr(engine, "transcribe_final"):
+            self.final = FinalWorker(self, cfg.get("final", {}).get("replace", True))
+        self._utterance = next(self._utterances)
+
+        self.window = None
+        self._reconfigured = False
+        self.configure()
+
+    def configure(self):
+        """Werte aus self.cfg übernehmen; Fenstergrößen greifen ab dem nächsten Fenster"""
+        cfg = self.cfg
         self.lang = None if cfg["language"] == "auto" else cfg["language"]
+        # Stille-Fenster werden nicht dekodiert
+        self.skip_silence = cfg["vad"].get("skip_silence", True)
+        # Fensterlänge folgt dem gemessenen Echtzeitfaktor
+        ccfg = cfg["chunk"]
+        args = (ccfg["seconds"], ccfg.get("min_seconds", ccfg["seconds"]),
+                ccfg.get("max_seconds", ccfg["seconds"]))
+        kwargs = dict(target_rtf=ccfg.get("target_rtf", 0.5), enable=ccfg.get("adaptive", True))
+        if self.window is None:
+            self.window = WindowController(*args, **kwargs)
+        else:
+            self.window.configure(*args, **kwargs)
+            self._reconfigured = True
+
+    def _timed(self, fn, *args, **kwargs):
+        if self._trigger_t is not None:
+            H_VAD_INFERENCE.observe(time.time() - self._trigger_t)
+            self._trigger_t = None
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            dt = time.perf_counter() - t0
+            self.last_decode_seconds = dt
+            H_INFERENCE.observe(dt)
+            self.decode_seconds = dt if not self.decode_seconds else 0.8 * self.decode_seconds + 0.2 * dt
+
+    def _emit(self, text):
+        # Volle text_q bremst den Worker; der Rückstau landet in der audio_q,
+        # die alte Teilfenster verwirft und Äußerungen auslagert
+        while self.running:
+            try:
+                uid = self._utterance if self.final and self.final.replace else None
+                self.out_q.put(Text(text, utterance=uid), timeout=0.2)
+                return
+            except queue.Full:
+                self.output_stalls += 1
+
+    def _log(self, marker, text, engine=None):
+        # Nur ein Queue-put; geschrieben wird im Thread des TranscriptLog
+        if self.transcript_log is None or not text:
+            return
+        engine = engine or self.engine
+        self.transcript_log.log({
+            "text": text,
+            "start": marker.start,
+            "end": marker.end,
+            "latency": round(time.time() - marker.t, 4),
+            "engine": engine.name,
+            "model": engine.cfg.get("model"),
+            "audio": marker.offsets,
+        })
+
+    def _finish(self, utterances):
+        # Erst nach den zugehörigen Teilergebnissen übergeben – das Final
+        # landet so immer hinter ihnen in der text_q
+        for u in utterances:
+            self.final.submit(u, self._utterance)
+            self._utterance = next(self._utterances)
+
+    def _skip(self, samples):
+        self.skipped_windows += 1
+        self.skipped_audio_seconds += samples / 16000
+        self.saved_inference_seconds += self.decode_seconds
+
+    def stop(self, drain=True):
+        """Beenden; mit drain erst die restliche audio_q abarbeiten"""
+        if drain:
+            self.draining = True
+        else:
+            self.running = False
 
     def run(self):
-        global ENGINE, MODEL
-        chunk_buf = b""
+        if self.final:
+            self.final.start()
+        try:
+            if self.streaming:
+                return self.run_streaming()
+            return self.run_window()
+        finally:
+            if self.final:
+                self.final.close()
+
+    def _get_pending(self):
+        # Rückstand auf einmal übernehmen statt pro Block zu dekodieren
+        try:
+            items = [self.audio_q.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                items.append(self.audio_q.get_nowait())
+            except queue.Empty:
+                break
+        H_AUDIO_DEPTH.observe(len(items))
+        for item in reversed(items):
+            if hasattr(item, "t"):
+                self._trigger_t = item.t
+                break
+        return items
+
+    def run_window(self):
         sample_rate = 16000
-        bytes_per_sec = sample_rate * 2
-        target = self.cfg["chunk"]["seconds"]
         overlap = self.cfg["chunk"]["overlap"]
 
-        # Sliding window in Bytes
-        window_bytes = int(bytes_per_sec * target)
-        overlap_bytes = int(bytes_per_sec * overlap)
+        # Sliding window in Samples
+        window_samples = int(sample_rate * self.window.seconds)
+        overlap_samples = int(sample_rate * overlap)
+
+        # Fester Ringpuffer statt wachsender Bytes – kein Umkopieren pro Block
+        buffer_seconds = self.cfg["chunk"].get("buffer_seconds", 30.0)
+        capacity = max(int(sample_rate * buffer_seconds), 2 * int(sample_rate * self.window.max_seconds))
+        chunk_buf = RingBuffer(capacity, dtype=np.float32)
+        window_voiced = False
+        fresh = 0           # neue Samples seit der letzten Fenster-Dekodierung
+        extra_cost = 0.0    # Dekodierzeit reiner Äußerungs-Aufrufe seitdem
+        self._reconfigured = False
 
         while self.running:
-            try:
-                data = self.audio_q.get(timeout=0.1)
-            except queue.Empty:
+            if self._reconfigured:
+                # Config neu geladen: Fenstergrößen ab jetzt neu
+                self._reconfigured = False
+                window_samples = int(sample_rate * self.window.seconds)
+                overlap_samples = int(sample_rate * self.cfg["chunk"]["overlap"])
+                needed = 2 * int(sample_rate * self.window.max_seconds)
+                if needed > chunk_buf.capacity:
+                    # Größeres Höchstfenster passt nicht mehr – Puffer samt Inhalt umziehen
+                    grown = RingBuffer(needed, dtype=np.float32)
+                    grown.write(chunk_buf.view())
+                    chunk_buf = grown
+            items = self._get_pending()
+            if not items:
+                if self.draining:
+                    break
                 continue
-            chunk_buf += data
-
-            if len(chunk_buf) >= window_bytes:
-                audio = np.frombuffer(chunk_buf, dtype=np.int16).astype(np.float32) / 32768.0
 
-                text = ""
-                if ENGINE == "faster-whisper":
-                    segments, _ = MODEL.transcribe(audio, language=self.lang, vad_filter=False, condition_on_previous_text=True)
-                    text = "".join(s.text for s in segments)
+            # Anstehende Segmente sammeln: Sliding Window + abgeschlossene Äußerungen
+            segments = []
+            sources = []        # Utterance je Segment, None für das Fenster
+            finished = []       # Äußerungen für das Final-Modell
+            for data in items:
+                if isinstance(data, Utterance) and self.final:
+                    finished.append(data)
+                elif isinstance(data, Utterance):
+                    segments.append(data.samples)
+                    sources.append(data)
+                elif isinstance(data, UtteranceEnd):
+                    continue    # Streaming-Marker (Modus stand beim Laden noch nicht fest)
                 else:
-                    # whisper.cpp
-                    text = MODEL.transcribe(audio, language=self.lang or "auto")
+                    chunk_buf.write(data.samples)
+                    fresh += len(data.samples)
+                    window_voiced = window_voiced or data.voiced
+            window_audio = 0
+            if len(chunk_buf) >= window_samples:
+                if window_voiced or not self.skip_silence:
+                    # View ohne Kopie – gültig bis zum nächsten write()
+                    segments.insert(0, chunk_buf.view())
+                    sources.insert(0, None)
+                    window_audio = fresh
+                else:
+                    # Kein stimmhafter Frame im Fenster – Inferenz sparen
+                    self._skip(len(chunk_buf) - overlap_samples)
+                fresh = 0
+                # Keep overlap
+                chunk_buf.keep(overlap_samples)
+                window_voiced = False
+            if not segments:
+                self._finish(finished)
+                continue
 
-                if self.cfg.get("punctuate", True):
-                    # faster-whisper liefert i.d.R. bereits punktuiert
-                    pass
+            # Mehrere Segmente in einem Engine-Aufruf (Batch, falls unterstützt)
+            if len(segments) == 1:
+                results = [self._timed(self.engine.transcribe, segments[0], language=self.lang)]
+            else:
+                results = self._timed(self.engine.transcribe_batch, segments, language=self.lang)
 
-                if text.strip():
-                    self.out_q.put(text.strip())
+            # RTF = Rechenzeit pro Sekunde neuem Audio; Äußerungen ohne
+            # Fenster werden der nächsten Fenster-Messung zugeschlagen
+            if window_audio:
+                seconds = self.window.update(extra_cost + self.last_decode_seconds,
+                                             window_audio / sample_rate)
+                window_samples = int(sample_rate * seconds)
+                extra_cost = 0.0
+            else:
+                extra_cost += self.last_decode_seconds
 
-                # Keep overlap
-                chunk_buf = chunk_buf[-overlap_bytes:]
+            if self.cfg.get("punctuate", True):
+                # faster-whisper liefert i.d.R. bereits punktuiert
+                pass
+
+            for r, source in zip(results, sources):
+                if r.text.strip():
+                    self._emit(r.text.strip())
+                    if source is not None:
+                        self._log(source, r.text.strip())
+            self._finish(finished)
+
+    def run_streaming(self):
+        # Local Agreement: Utterance-Puffer wird alle step_seconds neu
+        # dekodiert, getippt wird nur, was zwei Hypothesen bestätigen
+        sample_rate = 16000
+        scfg = self.cfg.get("streaming", {})
+        step = int(sample_rate * scfg.get("step_seconds", 0.5))
+        stream = StreamingTranscriber(
+            self._transcribe_words,
+            sample_rate=sample_rate,
+            trim_seconds=scfg.get("trim_seconds", 10.0),
+            max_seconds=self.cfg["chunk"].get("buffer_seconds", 30.0),
+        )
+        pending = 0
+        # Stille vor einer Äußerung nicht in den Puffer: nur ein kurzer
+        # Vorlauf, damit der Wortanfang nicht fehlt
+        preroll = RingBuffer(int(sample_rate * scfg.get("preroll_seconds", 0.3)), dtype=np.float32)
+        has_voice = False       # Puffer enthält Sprache seit letztem finish()
+        step_voiced = False     # stimmhafter Block seit der letzten Dekodierung
+        silent = 0              # verworfene Stille seit dem letzten gezählten Schritt
+        spoken = []             # bestätigter Text der laufenden Äußerung (Protokoll)
+        self._reconfigured = False
+
+        while self.running:
+            if self._reconfigured:
+                self._reconfigured = False
+                step = int(sample_rate * self.cfg.get("streaming", {}).get("step_seconds", 0.5))
+            items = self._get_pending()
+            if not items:
+                if self.draining:
+                    break
+                continue
+
+            text = ""
+            for data in items:
+                if isinstance(data, UtteranceEnd):
+                    # Audio der Äußerung liegt schon im Puffer – nur das Ende zählt
+                    done = stream.finish()
+                    text = " ".join(t for t in (text, done) if t)
+                    spoken.append(done)
+                    if self.final and isinstance(data, Utterance):
+                        # Teilergebnisse der Äußerung vor ihrem Final ausgeben
+                        if text:
+                            self._emit(text)
+                            text = ""
+                        self._finish([data])
+                    else:
+                        self._log(data, " ".join(t for t in spoken if t))
+                    spoken = []
+                    pending = 0
+                    has_voice = False
+                    continue
+                samples = data.samples
+                if self.skip_silence and not data.voiced and not has_voice:
+                    preroll.write(samples)
+                    silent += len(samples)
+                    if silent >= step:
+                        self._skip(silent)
+                        silent = 0
+                    continue
+                if len(preroll):
+                    stream.insert_audio(preroll.view())
+                    preroll.clear()
+                stream.insert_audio(samples)
+                pending += len(samples)
+                has_voice = True
+                step_voiced = step_voiced or data.voiced
+            if pending >= step:
+                pending = 0
+                if self.skip_silence and not step_voiced and not stream.tentative:
+                    # Nur Stille seit der letzten Hypothese und nichts offen:
+                    # Äußerung abschließen statt Stille neu zu dekodieren
+                    self._skip(step)
+                    stream.reset()
+                    has_voice = False
+                else:
+                    committed = self._timed(stream.process)
+                    text = " ".join(t for t in (text, committed) if t)
+                    spoken.append(committed)
+                step_voiced = False
+
+            self.tentative = stream.tentative
+            if text:
+                self._emit(text)
+
+    def _transcribe_words(self, audio, prompt):
+        r = self.engine.transcribe(audio, language=self.lang, prompt=prompt, word_timestamps=True)
+        return r.words, [end for _, end, _ in r.segments]
 
 class App:
-    def __init__(self, cfg):
-        self.cfg = cfg
-        self.audio_q = queue.Queue()
-        self.text_q = queue.Queue()
+    """Aufnahme, VAD, STT und Ausgabe.
+
+    Ohne engine wird das Modell im Hintergrund geladen und aufgewärmt;
+    Aufnahme und Hotkey laufen sofort, Audio aus der Ladezeit wartet in
+    der audio_q. on_ready(app) wird aufgerufen, sobald die Engine steht.
+    """
+    # Queue-Klassen (der Benchmark setzt instrumentierte Varianten ein)
+    audio_queue_class = AudioQueue
+    text_queue_class = queue.Queue
+
+    def __init__(self, cfg, engine=None, on_ready=None):
+        # Eigene Kopie: apply_config vergleicht mit dem, was tatsächlich läuft
+        self.cfg = copy.deepcopy(cfg)
+        cfg = self.cfg
+        self.engine = None
+        self.ready = threading.Event()
+        self.on_ready = on_ready
+        self.load_error = None
+        self._stt_lock = threading.Lock()
+        self._swap_gen = 0          # zählt Engine-Wechsel (nur der neueste gewinnt)
+        # Begrenzte Queues: ein Inferenz-Stau kostet alte Teilfenster statt RAM
+        qcfg = cfg.get("queues", {})
+        self.audio_q = self.audio_queue_class(
+            max_seconds=qcfg.get("audio_seconds", 10.0),
+            max_utterances=qcfg.get("memory_utterances", 4),
+            spool_dir=qcfg.get("spool_dir"),
+        )
+        self.text_q = self.text_queue_class(maxsize=qcfg.get("text_max", 32))
         self.stream = None
         self.vad = VADStream(cfg)
-        self.stt = STTWorker(cfg, self.audio_q, self.text_q)
-        self.typer = Typer(cfg["insert_mode"])
+        self.stt = None
+        self._retired = None    # abgelöster STT-Worker, der noch zu Ende läuft
+        # Vorläufig aus der Config; nach dem Laden entscheidet der STTWorker
+        self.streaming = (cfg.get("streaming", {}).get("enable", False)
+                          and create_engine(cfg).capabilities["word_timestamps"])
+        # Zweistufig: Äußerungen immer mit Audio einreihen (auch im Streaming)
+        self.finals = final_config(cfg) is not None
+        ocfg = cfg.get("output", {})
+        self.typer = Typer(cfg["insert_mode"], ocfg.get("paste_threshold", 40),
+                           ocfg.get("restore_ms", 300))
+        self.output = OutputWorker(self.text_q, self.typer, ocfg.get("coalesce_ms", 30),
+                                   cfg.get("final", {}).get("max_erase", 400))
         self.hotkey = cfg["hotkey"]
         self.active = False
         self.listener = None
 
+        # Callback → Verarbeitungs-Thread: lock-freier Ring, VAD läuft außerhalb
+        # des PortAudio-Threads
+        acfg = cfg.get("audio", {})
+        self.samplerate = 16000     # Rate für VAD und Engine
+        self.process_interval = acfg.get("process_ms", 100) / 1000.0
+        # float32 von PortAudio bis zur Engine; int16 nur für webrtcvad, in
+        # vorab angelegten Puffern
+        self.capture_rate = None
+        self.ring = None
+        self.resampler = None
+        self._setup_capture(self.samplerate)
+        self._scratch = np.zeros(self.ring.capacity, dtype=np.float32)
+        self._pcm16 = np.zeros(self.ring.capacity, dtype=np.int16)
+        # Optional: Noise-Gate und AGC vor VAD und Engine
+        self.preprocess = create_preprocessor(cfg, self.samplerate)
+        # Audio seit dem letzten Äußerungsende (für das Utterance-Segment)
+        self.utterance = RingBuffer(int(self.samplerate * cfg["chunk"].get("buffer_seconds", 30.0)),
+                                    dtype=np.float32)
+        # Optional: ganze Sitzung auf die Platte (mmap, konstanter RAM)
+        self.recorder = create_recorder(cfg, self.samplerate)
+        if self.recorder:
+            atexit.register(self.recorder.close)
+            print(f"[speakup] Sitzung wird aufgenommen: {self.recorder.path}")
+        # Optional: Transkript-Protokoll (eigener Schreib-Thread)
+        self.transcripts = create_transcript_log(cfg)
+        self.processor = None
+        self.processing = False
+        self.input_overflows = 0    # von PortAudio gemeldete verlorene Eingabe
+        self._push_time = 0.0       # Wall-Clock des letzten Callbacks
+
+        mcfg = cfg.get("metrics", {})
+        if mcfg.get("http", False):
+            serve_metrics(METRICS, mcfg.get("host", "127.0.0.1"), mcfg.get("port", 9464))
+        METRICS.gauge("audio_queue_items", "Aktuelle Tiefe der audio_q", self.audio_q.qsize)
+        METRICS.gauge("text_queue_items", "Aktuelle Tiefe der text_q", self.text_q.qsize)
+        METRICS.gauge("audio_queue_dropped_seconds_total", "Verworfene Teilfenster (Sekunden)",
+                      lambda: self.audio_q.dropped_seconds, kind="counter")
+        METRICS.gauge("audio_queue_spooled_total", "Auf die Platte ausgelagerte Äußerungen",
+                      lambda: self.audio_q.spooled, kind="counter")
+        METRICS.gauge("ring_overruns_total", "Verworfene Callback-Blöcke",
+                      lambda: self.ring.overruns, kind="counter")
+        METRICS.gauge("window_seconds", "Aktuelle Fensterlänge",
+                      lambda: self.stt.window.seconds if self.stt else float("nan"))
+        # Stille-Fenster ohne Inferenz (zählen pro STT-Worker)
+        METRICS.gauge("skipped_windows_total", "Übersprungene Fenster ohne Sprache",
+                      lambda: self.stt.skipped_windows if self.stt else 0, kind="counter")
+        METRICS.gauge("skipped_audio_seconds_total", "Audio in übersprungenen Fenstern (Sekunden)",
+                      lambda: self.stt.skipped_audio_seconds if self.stt else 0.0, kind="counter")
+        METRICS.gauge("saved_inference_seconds_total", "Geschätzte eingesparte Inferenzzeit",
+                      lambda: self.stt.saved_inference_seconds if self.stt else 0.0, kind="counter")
+
+        if engine is not None:
+            self._engine_ready(engine)
+        else:
+            print("[speakup] Lade Modell im Hintergrund – Aufnahme wird bis dahin gepuffert")
+            threading.Thread(target=self._load_engine, daemon=True, name="model-load").start()
+
+    @property
+    def loading(self):
+        return not self.ready.is_set()
+
+    def _load_engine(self):
+        gen = self._swap_gen
+        try:
+            cached = cache_key(self.cfg) in MODEL_CACHE
+            t0 = time.perf_counter()
+            engine = init_engine(self.cfg)
+            STARTUP["model"] = time.perf_counter() - t0
+            if not cached and self.cfg.get("warmup", True):
+                t0 = time.perf_counter()
+                engine.warmup()
+                STARTUP["warmup"] = time.perf_counter() - t0
+        except Exception as e:
+            if gen != self._swap_gen:
+                return      # Config wurde während des Ladens geändert – der Wechsel übernimmt
+            self.load_error = e
+            print(f"[speakup] Modell konnte nicht geladen werden: {e}")
+            if self.on_ready:
+                self.on_ready(self)
+            return
+        if gen != self._swap_gen:
+            return
+        self._engine_ready(engine)
+        if "hotkey" in STARTUP:
+            print(f"[speakup] {startup_report()}")
+
+    def _engine_ready(self, engine):
+        with self._stt_lock:
+            self.engine = engine
+            self.stt = STTWorker(self.cfg, self.audio_q, self.text_q, engine, self.transcripts)
+            self.streaming = self.stt.streaming
+            self.ready.set()
+            if self.processing:
+                # Während des Ladens aufgenommenes Audio wird jetzt nachgeholt
+                backlog = self.audio_q.block_samples / self.samplerate
+                if backlog:
+                    print(f"[speakup] Modell bereit – hole {backlog:.1f}s gepuffertes Audio nach")
+                self.stt.start()
+        if self.on_ready:
+            self.on_ready(self)
+
+    def apply_config(self, cfg):
+        """Geänderte Einstellungen auf der billigsten Stufe übernehmen.
+
+        Gibt {stufe: [schlüssel]} zurück (siehe reload.RULES).
+        """
+        plan = plan_changes(diff_config(self.cfg, cfg))
+        if not plan:
+            return plan
+        # Schlüsselweise ersetzen statt clear(): Worker lesen parallel
+        new = copy.deepcopy(cfg)
+        for key in list(self.cfg):
+            if key not in new:
+                del self.cfg[key]
+        self.cfg.update(new)
+
+        if "inplace" in plan:
+            self.vad.configure(self.cfg)
+            if not self.cfg.get("preprocess", {}).get("enable", False):
+                self.preprocess = None
+            elif self.preprocess:
+                self.preprocess.configure(self.cfg["preprocess"])
+            else:
+                self.preprocess = create_preprocessor(self.cfg, self.samplerate)
+            if self.stt is not None:
+                self.stt.configure()
+        if "output" in plan:
+            ocfg = self.cfg.get("output", {})
+            self.typer.mode = self.cfg["insert_mode"]
+            self.typer.paste_threshold = ocfg.get("paste_threshold", 40)
+            self.typer.restore_delay = ocfg.get("restore_ms", 300) / 1000.0
+            self.output.coalesce = ocfg.get("coalesce_ms", 30) / 1000.0
+            fcfg = self.cfg.get("final", {})
+            self.output.max_erase = fcfg.get("max_erase", 400)
+            with self._stt_lock:
+                if self.stt is not None and self.stt.final is not None:
+                    self.stt.final.replace = fcfg.get("replace", True)
+        if "log" in plan:
+            self.transcripts = create_transcript_log(self.cfg)
+            if self.stt is not None:
+                self.stt.transcript_log = self.transcripts
+        if "hotkey" in plan:
+            self.hotkey = self.cfg["hotkey"]
+            if self.listener:
+                self.listener.stop()    # run_hotkey_loop registriert neu
+        if "engine" in plan:
+            self.finals = final_config(self.cfg) is not None
+            self._swap_gen += 1
+            threading.Thread(target=self._swap_engine, args=(self._swap_gen,), daemon=True,
+                             name="model-swap").start()
+        elif "worker" in plan:
+            with self._stt_lock:
+                if self.stt is not None:
+                    self._restart_stt()
+        if "restart" in plan:
+            print(f"[speakup] Erst nach Neustart wirksam: {', '.join(plan['restart'])}")
+        return plan
+
+    def _swap_engine(self, gen):
+        # Neues Modell laden, während das alte weiter dekodiert
+        cfg = copy.deepcopy(self.cfg)
+        fcfg = final_config(cfg)
+        name = cfg['model'] + (f" + {fcfg['model']}" if fcfg else "")
+        print(f"[speakup] Lade {name} ({cfg['engine']}, {cfg['device']}) – "
+              "bisheriges Modell bleibt bis dahin aktiv")
+        try:
+            cached = cache_key(cfg) in MODEL_CACHE
+            engine = init_engine(cfg)
+            if not cached and cfg.get("warmup", True):
+                engine.warmup()
+        except Exception as e:
+            print(f"[speakup] Modellwechsel fehlgeschlagen, bleibe beim bisherigen: {e}")
+            return
+        with self._stt_lock:
+            if gen != self._swap_gen:
+                return      # inzwischen erneut umgestellt
+            initial = self.stt is None
+            if not initial:
+                self.engine = engine
+                streaming = (self.cfg.get("streaming", {}).get("enable", False)
+                             and engine.capabilities["word_timestamps"])
+                tiered = hasattr(engine, "transcribe_final")
+                if streaming == self.stt.streaming and tiered == (self.stt.final is not None):
+                    # Nächster Engine-Aufruf nutzt das neue Modell
+                    self.stt.engine = engine
+                else:
+                    self._restart_stt()
+        if initial:
+            # Erstladen wurde von der Änderung überholt
+            self._engine_ready(engine)
+        print(f"[speakup] Modell gewechselt: {name}")
+
+    def _restart_stt(self):
+        # Aufrufer hält _stt_lock. Der alte Worker beendet seinen laufenden
+        # Aufruf, erst danach übernimmt der neue die audio_q
+        old = self.stt
+        self.stt = STTWorker(self.cfg, self.audio_q, self.text_q, self.engine, self.transcripts)
+        self.streaming = self.stt.streaming
+        if old.ident is None:
+            return      # lief noch nicht; start_audio startet den neuen
+        old.stop(drain=False)
+        self._retired = old
+        self._start_stt()
+
+    def _start_stt(self):
+        # Aufrufer hält _stt_lock. Solange ein abgelöster Worker noch dekodiert
+        # oder die audio_q leert, übernimmt der neue erst danach
+        new = self.stt
+        old = self._retired
+        if old is None or not old.is_alive():
+            if self.processing:
+                new.start()
+            return
+
+        def handover():
+            old.join()
+            with self._stt_lock:
+                if self.stt is new and self.processing and new.ident is None:
+                    new.start()
+        threading.Thread(target=handover, daemon=True, name="stt-handover").start()
+
+    def _setup_capture(self, rate):
+        """Ring und Resampler für die Aufnahmerate anlegen (nur bei Wechsel)"""
+        if rate == self.capture_rate:
+            return
+        acfg = self.cfg.get("audio", {})
+        self.capture_rate = rate
+        self.ring = SPSCRing(int(rate * acfg.get("ring_seconds", 2.0)), dtype=np.float32)
+        self._proc_buf = np.zeros(self.ring.capacity, dtype=np.float32)
+        self.resampler = None
+        if rate != self.samplerate:
+            self.resampler = PolyphaseResampler(rate, self.samplerate, acfg.get("resample_zeros", 10))
+
+    def _native_rate(self, sd):
+        # Native Rate des Eingabegeräts: kein Resampling im Audio-Stack, und
+        # Geräte, die nur 44.1/48 kHz können, funktionieren auch
+        rate = self.cfg.get("audio", {}).get("samplerate")
+        if rate:
+            return int(rate)
+        try:
+            return int(sd.query_devices(kind="input")["default_samplerate"])
+        except Exception:
+            return self.samplerate
+
     def start_audio(self):
-        sd.default.samplerate = 16000
-        sd.default.channels = 1
-        self.stream = sd.InputStream(callback=self._callback, dtype='int16')
+        sd = _import("sounddevice")
+        self._setup_capture(self._native_rate(sd))
+        if self.resampler:
+            self.resampler.reset()
+        if self.preprocess:
+            self.preprocess.reset()
+        self.processing = True
+        self._t0 = time.time()
+        self._start_samples = self.ring.read_count
+        self.processor = threading.Thread(target=self._process_loop, daemon=True, name="audio-process")
+        self.processor.start()
+        self.stream = sd.InputStream(samplerate=self.capture_rate, channels=1,
+                                     callback=self._callback, dtype='float32')
         self.stream.start()
-        self.stt.start()
+        with self._stt_lock:
+            if self.stt is not None:
+                if self.stt.ident is not None:
+                    # Thread-Objekte lassen sich nicht zweimal starten
+                    self.stt = STTWorker(self.cfg, self.audio_q, self.text_q, self.engine,
+                                         self.transcripts)
+                self._start_stt()
 
     def stop_audio(self):
         if self.stream: self.stream.stop(); self.stream.close()
-        self.stt.running = False
+        self.processing = False
+        if self.processor:
+            self.processor.join(timeout=1.0)
+        # Nichts von dieser Aufnahme in die erste Äußerung der nächsten
+        self.vad.reset()
+        self.utterance.clear()
+        if self.input_overflows or self.ring.overruns:
+            print(f"[speakup] Input-Overflows: {self.input_overflows}, Ring-Überläufe: {self.ring.overruns}")
+        if self.audio_q.dropped_blocks or self.audio_q.spooled:
+            print(f"[speakup] audio_q: {self.audio_q.dropped_seconds:.1f}s Teilfenster verworfen, "
+                  f"{self.audio_q.spooled} Äußerungen ausgelagert, max. Tiefe {self.audio_q.max_depth}")
+        if self.preprocess and self.preprocess.blocks:
+            print(f"[speakup] Vorverarbeitung: {self.preprocess.per_block_us:.0f} µs/Block, "
+                  f"AGC {20 * np.log10(self.preprocess.gain):+.1f} dB")
+        if self.recorder:
+            self.recorder.flush()
+            print(f"[speakup] Aufnahme: {self.recorder.seconds:.0f}s, {self.recorder.utterances} Äußerungen")
+        if self.stt is None:
+            return
+        # Der Prozessor ist beendet, alle Blöcke dieser Aufnahme liegen in der
+        # audio_q – der Worker tippt sie noch, statt sie der nächsten zu überlassen
+        with self._stt_lock:
+            if self.stt.ident is not None:
+                self.stt.stop()
+                self._retired = self.stt
+        if self.stt.window.adjustments:
+            print(f"[speakup] Fenster angepasst: {self.stt.window.seconds:.2f}s "
+                  f"(RTF {self.stt.window.rtf:.2f}, {self.stt.window.adjustments} Anpassungen)")
+        if self.stt.skipped_windows:
+            print(f"[speakup] Stille übersprungen: {self.stt.skipped_windows} Fenster, "
+                  f"~{self.stt.saved_inference_seconds:.1f}s Inferenz gespart")
+        final = self.stt.final
+        if final and final.decoded:
+            print(f"[speakup] Teilergebnisse: Ø {self.stt.decode_seconds:.2f}s pro Aufruf; "
+                  f"Final-Modell: {final.decoded} Äußerungen, Ø {final.decode_seconds / final.decoded:.2f}s "
+                  f"pro Aufruf, Ø {final.latency_seconds / final.decoded:.2f}s nach Äußerungsende")
+        if self.output.replaced or self.output.replace_skipped:
+            print(f"[speakup] Finals: {self.output.replaced} ersetzt, "
+                  f"{self.output.replace_skipped} zu lang zum Ersetzen")
 
     def _callback(self, indata, frames, time_info, status):
-        tnow = time.time()
-        pcm16 = indata.copy()
-        _, end_event = self.vad.process(pcm16, tnow)
+        # Echtzeit-Thread: nur kopieren und zählen – keine Queues, keine VAD
+        if status.input_overflow:
+            self.input_overflows += 1
+        self.ring.push(indata[:, 0])
+        self._push_time = time.time()
+
+    def _process_loop(self):
+        # Blöcke von ~process_ms sammeln: weniger Overhead pro Aufruf und der
+        # VAD-Vorfilter kann über mehrere Frames vektorisieren
+        buf = self._proc_buf
+        rate = self.capture_rate
+        while True:
+            running = self.processing
+            n = self.ring.pop_into(buf)
+            if n:
+                # Sample-Uhr statt Wall-Clock: Zeitpunkt am Blockende
+                elapsed = (self.ring.read_count - self._start_samples) / rate
+                # Blockende wurde aufgenommen, bevor der Rest im Ring ankam
+                captured = self._push_time - len(self.ring) / rate
+                block = buf[:n]
+                if self.resampler:
+                    # Ganzer Block auf einmal nach 16 kHz (View, bis zum nächsten Block gültig)
+                    block = self.resampler.process(block)
+                self.process_block(block, self._t0 + elapsed)
+                H_CAPTURE_VAD.observe(max(0.0, time.time() - captured))
+            if not running:
+                break   # Rest ist verarbeitet
+            time.sleep(self.process_interval)
+
+    def _to_int16(self, samples):
+        # float32 → int16 ohne neue Arrays (Puffer wachsen nur bei größeren Blöcken)
+        n = len(samples)
+        if n > len(self._pcm16):
+            self._scratch = np.zeros(n, dtype=np.float32)
+            self._pcm16 = np.zeros(n, dtype=np.int16)
+        scratch = self._scratch[:n]
+        np.multiply(samples, 32767.0, out=scratch)
+        np.clip(scratch, -32768.0, 32767.0, out=scratch)
+        pcm16 = self._pcm16[:n]
+        np.copyto(pcm16, scratch, casting="unsafe")
+        return pcm16
+
+    def process_block(self, samples, tnow):
+        samples = samples.reshape(-1)
+        pre = self.preprocess      # apply_config kann ihn jederzeit tauschen
+        if pre:
+            # Gleiche Länge wie die Eingabe, ~32 ms verzögert
+            samples = pre.process(samples)
+        _, end_event = self.vad.process(self._to_int16(samples), tnow)
         # Bei VAD-Ende kompletten Block zum STT schieben (für Satzgenauigkeit)
         # Zusätzlich kontinuierlich Chunks schieben für Near-Realtime
-        self.audio_q.put(pcm16.tobytes())
+        voiced = not self.vad.enabled or self.vad.in_speech or self.vad.voiced_frames > 0
+        # Einzige Kopie pro Block: der Verarbeitungspuffer wird wiederverwendet
+        block = samples.copy()
+        self.audio_q.put(AudioBlock(block, voiced))
+        self.utterance.write(block)
+        if self.recorder:
+            self.recorder.write(block)
         if end_event:
-            self.audio_q.put(self.vad.pop_bytes())
+            offsets = self.recorder.end_utterance(tnow) if self.recorder else None
+            start = self.vad.start_time
+            if start is None:
+                start = tnow - len(self.utterance) / self.samplerate
+            if self.streaming and not self.finals:
+                # Audio liegt schon im Utterance-Puffer – nur Ende melden
+                self.audio_q.put(UtteranceEnd(start, tnow, offsets))
+            else:
+                self.audio_q.put(Utterance(self.utterance.view().copy(), start, tnow, offsets))
+            self.utterance.clear()
+        return end_event
 
     def toggle(self):
         self.active = not self.active
@@ -197,6 +1372,8 @@ class App:
             self.stop_audio()
 
     def run_hotkey_loop(self):
+        keyboard = _import("pynput.keyboard")
+
         def on_press(key):
             try:
                 combo = []
@@ -206,25 +1383,60 @@ class App:
             except Exception:
                 pass
 
-        with keyboard.GlobalHotKeys({ self.hotkey: self.toggle }) as h:
-            self.listener = h
-            # Output-Loop
-            while True:
-                try:
-                    text = self.text_q.get(timeout=0.2)
-                    self.typer.emit(text + " ")
-                except queue.Empty:
-                    pass
-
-def main():
-    cfg = load_config()
-    init_engine(cfg)
+        # Ausgabe im eigenen Thread – langsames Tippen blockiert weder
+        # Hotkeys noch die Inferenz
+        self.output.start()
+        while True:
+            hotkey = self.hotkey
+            with keyboard.GlobalHotKeys({ hotkey: self.toggle }) as h:
+                self.listener = h
+                if "hotkey" not in STARTUP:
+                    STARTUP["hotkey"] = time.perf_counter() - _T_START
+                    if not self.loading:
+                        print(f"[speakup] {startup_report()}")
+                h.join()
+            if self.hotkey == hotkey:
+                break
+            # apply_config hat den Listener für den neuen Hotkey beendet
+            print(f"[speakup] Hotkey: {self.hotkey}")
+
+STARTUP["import main"] = time.perf_counter() - _T_START
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="speakup", description="Lokales Speech-to-Text mit Hotkey")
+    parser.add_argument("--config", default="speakup/config.yaml", help="Pfad zur config.yaml")
+    sub = parser.add_subparsers(dest="command")
+
+    import transcribe, daemon, history, profiler
+    profiler.add_arguments(parser)
+    transcribe.add_parser(sub)
+    daemon.add_parser(sub)
+    history.add_parser(sub)
+
+    args = parser.parse_args(argv)
+    profiler.from_args(args)
+    if args.command == "transcribe":
+        return transcribe.run(args)
+    if args.command == "daemon":
+        return daemon.run(args)
+    if args.command == "search":
+        return history.run(args)
+
+    cfg = load_config(args.config)
+    # Modell lädt im Hintergrund – Hotkey ist sofort aktiv
     app = App(cfg)
     print(f"[speakup] Hotkey: {cfg['hotkey']} – Engine: {cfg['engine']} – Model: {cfg['model']}")
+
+    def on_change(new):
+        plan = app.apply_config(new)
+        if plan:
+            print("[speakup] Config neu geladen: " + ", ".join(
+                f"{level} ({', '.join(keys)})" for level, keys in plan.items()))
+    ConfigWatcher(args.config, on_change).start()
     try:
         app.run_hotkey_loop()
     except KeyboardInterrupt:
         pass
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+speakup - Metriken
+Histogramme für die Pipeline-Stufen, Ausgabe im Prometheus-Textformat
+(optional über einen lokalen HTTP-Endpunkt) und als Snapshot für die GUI.
+"""
+
+import bisect
+import collections
+import threading
+
+# Obergrenzen in Sekunden bzw. Elementen (Prometheus: le = kleiner gleich)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DEPTH_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+PREFIX = "speakup_"
+
+
+class Histogram:
+    """Kumulative Buckets wie bei Prometheus, dazu die letzten Werte für Quantile"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, window=1024):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._window = window
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(self.buckets) + 1)    # letzter: +Inf
+            self.sum = 0.0
+            self.count = 0
+            self.recent = collections.deque(maxlen=self._window)
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+            self.recent.append(value)
+
+    def quantile(self, q):
+        with self._lock:
+            values = sorted(self.recent)
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+        }
+
+    def render(self):
+        name = PREFIX + self.name
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        lines = [f"# HELP {name} {self.help}", f"# TYPE {name} histogram"]
+        cumulative = 0
+        for le, n in zip(self.buckets, counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{{le="{le:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{le="+Inf"}} {count}')
+        lines.append(f"{name}_sum {total:.6f}")
+        lines.append(f"{name}_count {count}")
+        return lines
+
+
+class Gauge:
+    """Wert, der beim Auslesen per Callback geholt wird (auch für Zähler)"""
+
+    def __init__(self, name, help, fn, kind="gauge"):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.kind = kind
+
+    def value(self):
+        try:
+            return float(self.fn())
+        except Exception:
+            return float("nan")
+
+    def snapshot(self):
+        return self.value()
+
+    def render(self):
+        name = PREFIX + self.name
+        return [f"# HELP {name} {self.help}", f"# TYPE {name} {self.kind}",
+                f"{name} {self.value():g}"]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        """Histogramm anlegen oder das vorhandene gleichen Namens liefern"""
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, help, buckets)
+            return self._metrics[name]
+
+    def gauge(self, name, help, fn, kind="gauge"):
+        """Gauge registrieren; ersetzt einen vorhandenen gleichen Namens"""
+        with self._lock:
+            self._metrics[name] = Gauge(name, help, fn, kind)
+            return self._metrics[name]
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def reset(self):
+        for m in list(self._metrics.values()):
+            if isinstance(m, Histogram):
+                m.reset()
+
+    def snapshot(self):
+        return {name: m.snapshot() for name, m in list(self._metrics.items())}
+
+    def render(self):
+        lines = []
+        for m in list(self._metrics.values()):
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+# Prozessweite Registry (wie der Modell-Cache)
+METRICS = Registry()
+
+_server = None
+
+
+def serve(registry=METRICS, host="127.0.0.1", port=9464):
+    """GET /metrics im Prometheus-Textformat; läuft als Daemon-Thread.
+
+    Mehrfache Aufrufe starten keinen zweiten Server.
+    """
+    global _server
+    if _server is not None:
+        return _server
+    # Erst hier importiert: http.server kostet beim Start spürbar Zeit
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    _server = ThreadingHTTPServer((host, port), Handler)
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, daemon=True, name="metrics-http").start()
+    return _server
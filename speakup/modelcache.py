@@ -0,0 +1,172 @@
+"""
+speakup - Modell-Cache
+Hält geladene STT-Modelle über Start/Stop und Settings-Änderungen hinweg
+im Speicher; Verdrängung nach LRU innerhalb eines Speicherbudgets.
+"""
+
+import gc
+import threading
+from collections import Counter, OrderedDict
+
+# Grobe Modellgrößen in MB (float16); dient nur der Budget-Abschätzung
+MODEL_SIZES_MB = {
+    "tiny": 75,
+    "base": 145,
+    "small": 470,
+    "medium": 1500,
+    "large-v1": 3000,
+    "large-v2": 3000,
+    "large-v3": 3000,
+}
+
+# Faktor relativ zu float16
+COMPUTE_TYPE_FACTOR = {
+    "float32": 2.0,
+    "int8": 0.5,
+    "int8_float16": 0.5,
+    "int8_float32": 0.5,
+    "int8_bfloat16": 0.5,
+}
+
+
+def cache_key(cfg):
+    """(engine, model, device, compute_type) – identifiziert ein geladenes Modell"""
+    return (cfg["engine"], cfg["model"], cfg.get("device", "auto"), cfg.get("compute_type", "default"))
+
+
+def estimate_mb(key):
+    engine, model, _, compute_type = key
+    if engine == "daemon":
+        return 0    # Modell liegt im Daemon-Prozess
+    name = str(model).split("/")[-1].replace("distil-", "")
+    size = MODEL_SIZES_MB.get(name.replace(".en", ""), 1500)
+    return size * COMPUTE_TYPE_FACTOR.get(compute_type, 1.0)
+
+
+class ModelCache:
+    """LRU-Cache für geladene Modelle.
+
+    memory_mb = 0 bedeutet kein Budget; das zuletzt benutzte Modell wird nie
+    verdrängt, auch wenn es allein das Budget überschreitet. Gemeinsam
+    angeforderte Modelle (get_group, z.B. Teil- und Final-Modell) bilden eine
+    Gruppe: sie verdrängen sich nicht gegenseitig und fliegen nur zusammen.
+
+    Geladen wird außerhalb des Locks – ein Ladevorgang von mehreren Sekunden
+    blockiert keine anderen Abfragen. Wer dasselbe Modell gleichzeitig
+    anfordert, wartet auf den laufenden Ladevorgang statt ein zweites Mal
+    zu laden.
+    """
+
+    def __init__(self, memory_mb=0, max_models=0):
+        self.memory_mb = memory_mb
+        self.max_models = max_models
+        self._entries = OrderedDict()   # key -> (model, size_mb)
+        self._groups = {}               # key -> Schlüssel der gemeinsam geladenen Modelle
+        self._lock = threading.Lock()
+        self._loading = {}              # key -> Event, solange das Modell lädt
+        self._busy = Counter()          # Schlüssel laufender get_group-Aufrufe (nicht verdrängen)
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, memory_mb=None, max_models=None):
+        with self._lock:
+            if memory_mb is not None:
+                self.memory_mb = memory_mb
+            if max_models is not None:
+                self.max_models = max_models
+            self._evict()
+
+    def get(self, key, loader):
+        """Modell aus dem Cache oder per loader() laden und aufnehmen"""
+        return self.get_group([(key, loader)])[0]
+
+    def get_group(self, items):
+        """Mehrere Modelle [(key, loader)] gemeinsam holen; Liste der Modelle"""
+        keys = [key for key, _ in items]
+        with self._lock:
+            self._busy.update(keys)
+        try:
+            models = [self._fetch(key, loader) for key, loader in items]
+            with self._lock:
+                for key in keys:
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                if len(keys) > 1:
+                    for key in keys:
+                        self._groups[key] = frozenset(keys)
+                self._evict(keep=set(keys))
+            return models
+        finally:
+            with self._lock:
+                self._busy.subtract(keys)
+                self._busy += Counter()     # Nullen entfernen
+
+    def _fetch(self, key, loader):
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][0]
+                loading = self._loading.get(key)
+                if loading is None:
+                    loading = self._loading[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # Lädt gerade ein anderer Thread: abwarten und erneut nachsehen
+            # (schlägt sein Laden fehl, versucht es dieser Thread selbst)
+            loading.wait()
+        try:
+            model = loader()
+            with self._lock:
+                self._entries[key] = (model, estimate_mb(key))
+            return model
+        finally:
+            with self._lock:
+                del self._loading[key]
+            loading.set()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def keys(self):
+        return list(self._entries)
+
+    def usage_mb(self):
+        return sum(size for _, size in self._entries.values())
+
+    def evict(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._groups.pop(key, None)
+                gc.collect()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
+            gc.collect()
+
+    def _evict(self, keep=()):
+        # Standard: das zuletzt benutzte Modell (samt Gruppe) bleibt
+        if not keep and self._entries:
+            last = next(reversed(self._entries))
+            keep = self._groups.get(last, (last,))
+        keep = set(keep) | set(self._busy)
+        evicted = False
+        while (
+            (self.memory_mb and self.usage_mb() > self.memory_mb)
+            or (self.max_models and len(self._entries) > self.max_models)
+        ):
+            oldest = next((key for key in self._entries if key not in keep), None)
+            if oldest is None:
+                break
+            # Mit der ganzen Gruppe: ein halber Tier müsste beim nächsten Start
+            # ohnehin neu geladen werden
+            for key in self._groups.get(oldest, (oldest,)):
+                if key not in keep and self._entries.pop(key, None) is not None:
+                    self._groups.pop(key, None)
+            evicted = True
+        if evicted:
+            # CTranslate2/whisper.cpp geben Speicher erst beim Freigeben des Objekts zurück
+            gc.collect()
@@ -0,0 +1,204 @@
+"""
+speakup - Vorverarbeitung vor VAD und Engine
+Spektrales Noise-Gate und automatische Pegelregelung (AGC) für leise oder
+verrauschte Mikrofone. Arbeitet blockweise: alle Frames eines Blocks gehen
+als Matrix durch eine FFT, Verstärkungen werden als Vektoren angewendet –
+keine Python-Schleife pro Sample oder Frame.
+
+Noise-Gate: STFT mit 512er-Frames (32 ms bei 16 kHz), 50% Überlappung,
+Wurzel-Hann-Fenster für Analyse und Synthese. Das Rauschspektrum wird aus
+den leisesten Frames jedes Blocks geschätzt (fällt sofort, steigt langsam –
+wie der Rauschboden des VAD-Vorfilters). Bins nahe am Rauschen werden um bis
+zu noise_reduction_db gedämpft. Kostet eine feste Verzögerung von 511
+Samples (~32 ms); die Ausgabe ist immer genauso lang wie die Eingabe.
+"""
+
+import time
+
+import numpy as np
+
+FRAME = 512
+HOP = FRAME // 2
+# Überschätzung des Rauschens bei der Subtraktion (weniger Restrauschen)
+OVERSUBTRACT = 2.0
+# Blöcke unter diesem Pegel bzw. nicht klar über dem Rauschboden gelten als
+# Pause und verstellen die AGC nicht (sonst wird in Pausen das Rauschen hochgezogen)
+AGC_MIN_DBFS = -50.0
+AGC_MIN_SNR = 2.0
+# So lange nach dem letzten Sprachblock bleibt die volle Verstärkung stehen
+# (kein Pumpen zwischen Silben); danach fällt sie in Pausen auf höchstens 1.
+# Blöcke auf Höhe des Rauschbodens bekommen sie nie – verstärktes Rauschen
+# direkt nach Sprache hält sonst die VAD offen
+AGC_HOLD_S = 0.15
+AGC_HOLD_SNR = 1.5
+
+
+class Preprocessor:
+    """Noise-Gate und AGC für float32-Mono-Blöcke (16 kHz).
+
+    process() liefert einen View auf einen internen Puffer, gültig bis zum
+    nächsten Aufruf.
+    """
+
+    def __init__(self, pcfg, samplerate=16000):
+        self.samplerate = samplerate
+        self.window = np.sqrt(np.hanning(FRAME + 1)[:-1]).astype(np.float32)
+        self.delay_samples = FRAME - 1
+        self.noise = None           # Rauschleistung pro Bin
+        self.gain = 1.0             # aktuelle AGC-Verstärkung (linear)
+        self.level_floor = None     # RMS der leisesten Blöcke (vor AGC)
+        self._applied = 1.0         # am Ende des letzten Blocks angewendet
+        self._hold = 0.0
+        self.cpu_seconds = 0.0
+        self.blocks = 0
+        self._capacity = -1
+        self._alloc(0)
+        self.configure(pcfg)
+        self.reset()
+
+    def configure(self, pcfg):
+        """Einstellungen übernehmen (auch im laufenden Betrieb)"""
+        self.noise_gate = pcfg.get("noise_gate", True)
+        self.floor = 10 ** (-pcfg.get("noise_reduction_db", 12.0) / 20.0)
+        self.agc = pcfg.get("agc", True)
+        self.target = 10 ** (pcfg.get("target_dbfs", -20.0) / 20.0)
+        self.max_gain = 10 ** (pcfg.get("max_gain_db", 24.0) / 20.0)
+        self.release = pcfg.get("agc_release_s", 2.0)
+
+    def _alloc(self, n):
+        # Eingabe: bis zu FRAME-1 Reste + n; Ausgabe: Verzögerung + n + HOP
+        if n <= self._capacity:
+            return
+        self._capacity = n
+        old_in, old_pend = getattr(self, "_in", None), getattr(self, "_pend", None)
+        self._in = np.zeros(n + FRAME, dtype=np.float32)
+        self._pend = np.zeros(n + 2 * FRAME, dtype=np.float32)
+        if old_in is not None:
+            # Zustand (Reste, noch nicht ausgegebene Samples) mitnehmen
+            self._in[:len(old_in)] = old_in
+            self._pend[:len(old_pend)] = old_pend
+        self._frames = np.zeros((n // HOP + 2, FRAME), dtype=np.float32)
+        self._out = np.zeros(n, dtype=np.float32)
+        self._ramp = np.arange(n, dtype=np.float32)
+        self._scratch = np.zeros(n, dtype=np.float32)
+
+    def reset(self):
+        """Neue Aufnahme: Puffer leeren (Rausch- und Pegelschätzung bleiben)"""
+        self._inlen = 0
+        self._pend[:self.delay_samples] = 0
+        self._pendlen = self.delay_samples
+        self._ola = np.zeros(HOP, dtype=np.float32)
+
+    def process(self, samples):
+        t0 = time.perf_counter()
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        n = len(samples)
+        self._alloc(n)
+        out = self._out[:n]
+        if self.noise_gate:
+            self._gate(samples, out)
+        else:
+            out[:] = samples
+        if self.agc and n:
+            self._agc(out)
+        self.cpu_seconds += time.perf_counter() - t0
+        self.blocks += 1
+        return out
+
+    def _gate(self, samples, out):
+        n = len(samples)
+        total = self._inlen + n
+        buf = self._in
+        buf[self._inlen:total] = samples
+        count = (total - FRAME) // HOP + 1 if total >= FRAME else 0
+        if count:
+            frames = self._frames[:count]
+            view = np.lib.stride_tricks.sliding_window_view(buf[:total], FRAME)[::HOP][:count]
+            np.multiply(view, self.window, out=frames)
+            spec = np.fft.rfft(frames, axis=1)
+            power = spec.real ** 2 + spec.imag ** 2
+            self._update_noise(power)
+            # Spektrale Subtraktion als Verstärkung je Bin, nach unten begrenzt
+            # (harter Gate-Boden erzeugt "musical noise")
+            gain = 1.0 - OVERSUBTRACT * self.noise / (power + 1e-12)
+            np.clip(gain, self.floor, 1.0, out=gain)
+            spec *= gain
+            y = np.fft.irfft(spec, n=FRAME, axis=1).astype(np.float32, copy=False)
+            y *= self.window
+            # Overlap-Add: Ausgabe k = zweite Hälfte von Frame k-1 + erste von Frame k
+            seg = y[:, :HOP]
+            seg[0] += self._ola
+            seg[1:] += y[:-1, HOP:]
+            self._ola[:] = y[-1, HOP:]
+            done = count * HOP
+            self._pend[self._pendlen:self._pendlen + done] = seg.reshape(-1)
+            self._pendlen += done
+            buf[:total - done] = buf[done:total]
+            total -= done
+        self._inlen = total
+        out[:] = self._pend[:n]
+        rest = self._pendlen - n
+        self._pend[:rest] = self._pend[n:self._pendlen]
+        self._pendlen = rest
+
+    def _update_noise(self, power):
+        # Leiseste Frames des Blocks als Kandidat für das Rauschspektrum
+        energy = power.sum(axis=1)
+        quiet = power[energy <= 2.0 * energy.min()].mean(axis=0)
+        # Fällt sofort, steigt langsam; entschieden wird über die
+        # Gesamtenergie, ein Minimum je Bin wäre systematisch zu niedrig
+        level = quiet.sum()
+        if self.noise is None or level < self.noise.sum():
+            self.noise = quiet
+        elif level < 4.0 * self.noise.sum():
+            self.noise += 0.05 * (quiet - self.noise)
+        else:
+            # Ganzer Block klar darüber: Sprache – nur sehr langsam nachziehen,
+            # damit ein dauerhaft lauterer Raum trotzdem erkannt wird
+            self.noise += 0.002 * (quiet - self.noise)
+
+    def _agc(self, out):
+        n = len(out)
+        rms = float(np.sqrt(np.dot(out, out) / n))
+        # Rauschboden wie beim VAD-Vorfilter: fällt sofort, steigt langsam
+        if self.level_floor is None or rms < self.level_floor:
+            self.level_floor = rms
+        else:
+            self.level_floor += 0.02 * (rms - self.level_floor)
+        seconds = n / self.samplerate
+        if rms > max(10 ** (AGC_MIN_DBFS / 20.0), AGC_MIN_SNR * self.level_floor):
+            peak = float(np.abs(out).max())
+            desired = min(self.target / rms, self.max_gain, 0.99 / peak)
+            if desired < self.gain:
+                self.gain = desired     # Attack sofort: nicht übersteuern
+            else:
+                self.gain += (desired - self.gain) * (1.0 - np.exp(-seconds / self.release))
+            self._hold = AGC_HOLD_S
+        else:
+            self._hold = max(0.0, self._hold - seconds)
+        # Pausen nicht verstärken – sonst zieht die AGC das Rauschen hoch
+        noise = rms <= AGC_HOLD_SNR * self.level_floor
+        applied = min(self.gain, 1.0) if noise or self._hold <= 0 else self.gain
+        if noise and applied < self._applied:
+            # Im Rauschen sofort zurück: eine Rampe würde den Pausenanfang
+            # verstärken, der Sprung ist bei diesem Pegel nicht zu hören
+            self._applied = applied
+        # Linear von der alten zur neuen Verstärkung über den Block: keine Sprünge
+        ramp = self._scratch[:n]
+        np.multiply(self._ramp[:n], (applied - self._applied) / n, out=ramp)
+        ramp += self._applied
+        out *= ramp
+        np.clip(out, -1.0, 1.0, out=out)
+        self._applied = applied
+
+    @property
+    def per_block_us(self):
+        return self.cpu_seconds / max(1, self.blocks) * 1e6
+
+
+def create_preprocessor(cfg, samplerate=16000):
+    """Preprocessor laut Config (preprocess.enable) oder None"""
+    pcfg = cfg.get("preprocess", {})
+    if not pcfg.get("enable", False):
+        return None
+    return Preprocessor(pcfg, samplerate)
@@ -0,0 +1,212 @@
+"""
+speakup - Sampling-Profiler (--profile)
+Ein eigener Thread liest alle interval Sekunden die Stacks aller Threads
+(sys._current_frames, also auch Daemon-Threads wie STTWorker) und zählt sie.
+Kein sys.setprofile: der Profiler kostet nur seinen eigenen Takt, die
+profilierten Threads laufen unverändert.
+
+Pro Thread wird zusätzlich die CPU-Uhr gelesen (pthread_getcpuclockid, nur
+Unix). Die CPU-Zeit seit dem letzten Takt wird dem gerade gesehenen Stack
+zugeschlagen – so trennt das CPU-Profil Rechnen von Warten (Queue.get,
+sleep, PortAudio).
+
+Beim Beenden entstehen in out_dir:
+  speakup-<pid>.wall.collapsed  Samples je Stack (Wall-Clock)
+  speakup-<pid>.cpu.collapsed   CPU-Zeit je Stack in Mikrosekunden
+  speakup-<pid>.summary.txt     CPU-Zeit und Top-Funktionen pro Thread
+Die .collapsed-Dateien (eine Zeile "thread;äußerer;…;innerer anzahl") lesen
+flamegraph.pl, speedscope und inferno direkt als Flame Graph.
+"""
+
+import atexit
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+DEFAULT_INTERVAL_MS = 10.0
+
+
+def _cpu_clock(ident):
+    # CPU-Uhr eines Threads; None, wenn das System sie nicht liefert
+    try:
+        return time.pthread_getcpuclockid(ident)
+    except (AttributeError, OSError):
+        return None
+
+
+class SamplingProfiler(threading.Thread):
+    """Stack-Sampler für alle Threads des Prozesses"""
+
+    def __init__(self, out_dir=".", interval_ms=DEFAULT_INTERVAL_MS):
+        super().__init__(daemon=True, name="profiler")
+        self.out_dir = out_dir
+        self.interval = interval_ms / 1000.0
+        self.running = True
+        self.wall = Counter()       # (thread, stack) -> Samples
+        self.cpu = Counter()        # (thread, stack) -> CPU-Mikrosekunden
+        self.samples = Counter()    # thread -> Samples
+        self.cpu_seconds = Counter()    # thread -> CPU-Zeit während des Profils
+        self.ticks = 0
+        self._labels = {}           # code -> "funktion (datei:zeile)"
+        self._clocks = {}           # Thread-Schlüssel -> clockid (None: keine Uhr)
+        self._last = {}             # Thread-Schlüssel -> letzter CPU-Wert
+        self._native = {}           # ident -> Name fremder Threads
+        self._t0 = None
+        self._own_cpu = None
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _native_name(self, ident, frame):
+        # Fremder Thread (z.B. PortAudio-Callback): nach der äußersten Python-Funktion
+        name = self._native.get(ident)
+        if name is None:
+            while frame.f_back is not None:
+                frame = frame.f_back
+            name = self._native[ident] = f"native:{frame.f_code.co_name}"
+        return name
+
+    def _cpu(self, key, ident, name):
+        # CPU-Zeit des Threads seit dem letzten Takt (0 ohne CPU-Uhr)
+        clock = self._clocks.get(key, False)
+        if clock is False:
+            clock = self._clocks[key] = _cpu_clock(ident)
+        if clock is None:
+            return 0.0
+        try:
+            now = time.clock_gettime(clock)
+        except OSError:
+            return 0.0      # Thread ist gerade beendet worden
+        last = self._last.get(key)
+        self._last[key] = now
+        if last is None:
+            # Erst nach Profilstart entstanden: seine ganze CPU-Zeit zählt
+            last = 0.0 if self.ticks else now
+        self.cpu_seconds[name] += now - last
+        return now - last
+
+    def sample(self):
+        me = threading.get_ident()
+        # Thread-IDs werden wiederverwendet: Namen in jedem Takt neu zuordnen
+        threads = {t.ident: t for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            thread = threads.get(ident)
+            if thread is not None:
+                name = thread.name
+                key = (ident, thread.native_id)
+            else:
+                name = self._native_name(ident, frame)
+                key = (ident, None)
+            stack = []
+            f = frame
+            while f is not None:
+                stack.append(self._label(f.f_code))
+                f = f.f_back
+            stack.reverse()
+            stack = ";".join(stack)
+            self.wall[(name, stack)] += 1
+            self.samples[name] += 1
+            used = self._cpu(key, ident, name)
+            if used > 0:
+                self.cpu[(name, stack)] += int(used * 1e6)
+        self.ticks += 1
+
+    def run(self):
+        self._t0 = time.perf_counter()
+        clock = _cpu_clock(threading.get_ident())
+        own_start = time.clock_gettime(clock) if clock is not None else None
+        next_tick = time.perf_counter()
+        while self.running:
+            self.sample()
+            next_tick += self.interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.perf_counter()     # zu langsam: Takt nicht nachholen
+        if clock is not None:
+            self._own_cpu = time.clock_gettime(clock) - own_start
+
+    def stop(self):
+        self.running = False
+        self.join(timeout=1.0)
+        return self.write()
+
+    def summary(self):
+        elapsed = time.perf_counter() - (self._t0 or time.perf_counter())
+        lines = [f"speakup-Profil: {elapsed:.1f}s, {self.ticks} Takte à {self.interval * 1000:.1f} ms"]
+        own = self._own_cpu
+        if own is not None and elapsed:
+            lines.append(f"Profiler selbst: {own:.2f}s CPU ({own / elapsed:.1%})")
+        lines.append("")
+        lines.append(f"{'Thread':<28} {'CPU s':>8} {'CPU %':>7} {'Samples':>8}")
+        has_clock = any(c is not None for c in self._clocks.values())
+        names = sorted(self.samples, key=lambda n: (-self.cpu_seconds[n], -self.samples[n]))
+        for name in names:
+            cpu = self.cpu_seconds[name]
+            cpu_s = f"{cpu:.2f}" if has_clock else "-"
+            pct = f"{cpu / elapsed:.1%}" if has_clock and elapsed else "-"
+            lines.append(f"{name[:28]:<28} {cpu_s:>8} {pct:>7} {self.samples[name]:>8}")
+        for name in names:
+            top = self._top(name)
+            if not top:
+                continue
+            lines.append("")
+            lines.append(f"{name} – Funktionen mit der meisten CPU-Zeit (eigene Zeit):")
+            for label, us in top:
+                lines.append(f"  {us / 1000:>9.1f} ms  {label}")
+        return "\n".join(lines)
+
+    def _top(self, name, n=5):
+        own = Counter()
+        for (thread, stack), count in self.cpu.items():
+            if thread == name:
+                own[stack.rsplit(";", 1)[-1]] += count
+        return own.most_common(n)
+
+    def write(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        base = os.path.join(self.out_dir, f"speakup-{os.getpid()}")
+        for suffix, counts in ((".wall.collapsed", self.wall), (".cpu.collapsed", self.cpu)):
+            with open(base + suffix, "w", encoding="utf-8") as f:
+                for (name, stack), count in sorted(counts.items()):
+                    f.write(f"{name.replace(';', ':')};{stack} {count}\n")
+        text = self.summary()
+        with open(base + ".summary.txt", "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(text)
+        print(f"[speakup] Profil geschrieben: {base}.{{wall,cpu}}.collapsed, {base}.summary.txt")
+        return base
+
+
+def add_arguments(parser):
+    parser.add_argument("--profile", action="store_true",
+                        help="Alle Threads sampeln; Flame-Graph-Stacks und CPU pro Thread beim Beenden schreiben")
+    parser.add_argument("--profile-dir", default=".", metavar="DIR",
+                        help="Ausgabeverzeichnis des Profilers (Standard: aktuelles Verzeichnis)")
+    parser.add_argument("--profile-interval", type=float, default=DEFAULT_INTERVAL_MS, metavar="MS",
+                        help="Abtastintervall des Profilers (Standard: %(default)s ms)")
+
+
+def start(out_dir, interval_ms=DEFAULT_INTERVAL_MS):
+    """Profiler starten; schreibt beim Prozessende (atexit)"""
+    profiler = SamplingProfiler(out_dir, interval_ms)
+    profiler.start()
+    atexit.register(profiler.stop)
+    print(f"[speakup] Profiler aktiv ({interval_ms:g} ms) – Ausgabe beim Beenden nach {os.path.abspath(out_dir)}")
+    return profiler
+
+
+def from_args(args):
+    """Profiler laut --profile starten (oder None)"""
+    if not getattr(args, "profile", False):
+        return None
+    return start(args.profile_dir, args.profile_interval)
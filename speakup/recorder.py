@@ -0,0 +1,141 @@
+"""
+speakup - Sitzungsaufnahme
+Schreibt das aufgenommene Audio (float32, 16 kHz mono) in eine Datei, die
+abschnittsweise per mmap beschrieben wird, dazu einen Index mit den
+Sample-Offsets jeder Äußerung. Der RAM-Bedarf bleibt auch bei stundenlangen
+Sitzungen konstant; jede Äußerung lässt sich später direkt von der Platte
+neu transkribieren (speakup transcribe sitzung.f32).
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+
+DTYPE = np.dtype(np.float32)
+INDEX_SUFFIX = ".idx"
+
+
+class SessionRecorder:
+    """Audio einer Sitzung als Rohdatei plus Äußerungs-Index.
+
+    Gemappt ist immer nur der aktuelle Abschnitt von grow_seconds; ist er
+    voll, wird die Datei verlängert und der nächste Abschnitt gemappt.
+    Der Index (eine JSON-Zeile pro Äußerung) wird sofort angehängt, damit
+    er auch einen Absturz übersteht.
+    """
+
+    def __init__(self, directory, sample_rate=16000, grow_seconds=300.0):
+        os.makedirs(directory, exist_ok=True)
+        name = time.strftime("session-%Y%m%d-%H%M%S")
+        self.path = os.path.join(directory, name + ".f32")
+        self.index_path = self.path + INDEX_SUFFIX
+        self.sample_rate = sample_rate
+        self.chunk = max(1, int(sample_rate * grow_seconds))
+        self.samples = 0            # geschriebene Samples insgesamt
+        self.utterances = 0
+        self._mark = 0              # Beginn der laufenden Äußerung
+        self._map = None
+        self._map_start = 0
+        self._file = open(self.path, "wb+")
+        self._index = open(self.index_path, "a", encoding="utf-8")
+        self._remap(0)
+
+    def _remap(self, start):
+        # Datei um einen Abschnitt verlängern (sparse) und nur diesen mappen
+        if self._map is not None:
+            self._map.flush()
+            self._map = None
+        end = (start + self.chunk) * DTYPE.itemsize
+        if os.fstat(self._file.fileno()).st_size < end:
+            self._file.truncate(end)
+        self._map = np.memmap(self._file, dtype=DTYPE, mode="r+",
+                              offset=start * DTYPE.itemsize, shape=(self.chunk,))
+        self._map_start = start
+
+    def write(self, samples):
+        if self._map is None:
+            return
+        samples = np.asarray(samples, dtype=DTYPE).reshape(-1)
+        while len(samples):
+            pos = self.samples - self._map_start
+            if pos >= self.chunk:
+                self._remap(self.samples)
+                pos = 0
+            n = min(len(samples), self.chunk - pos)
+            self._map[pos:pos + n] = samples[:n]
+            self.samples += n
+            samples = samples[n:]
+
+    def end_utterance(self, t=None):
+        """Äußerung vom letzten Ende bis jetzt in den Index schreiben.
+
+        Gibt {"session", "start", "end"} (Sample-Offsets) zurück, ohne Audio None.
+        """
+        if self._map is None or self.samples == self._mark:
+            return None
+        entry = {"start": self._mark, "end": self.samples, "t": t if t is not None else time.time()}
+        self._index.write(json.dumps(entry) + "\n")
+        self._index.flush()
+        self._mark = self.samples
+        self.utterances += 1
+        return {"session": self.path, "start": entry["start"], "end": entry["end"]}
+
+    def flush(self):
+        if self._map is not None:
+            self._map.flush()
+        self._index.flush()
+
+    def close(self):
+        """Datei auf die geschriebene Länge kürzen und schließen"""
+        if self._map is None:
+            return
+        self._map.flush()
+        self._map = None
+        self._file.truncate(self.samples * DTYPE.itemsize)
+        self._file.close()
+        self._index.close()
+
+    @property
+    def seconds(self):
+        return self.samples / self.sample_rate
+
+
+class SessionRecording:
+    """Lesezugriff auf eine Aufnahme; Äußerungen sind Views auf die Datei"""
+
+    def __init__(self, path, sample_rate=16000):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.utterances = []
+        if os.path.exists(path + INDEX_SUFFIX):
+            with open(path + INDEX_SUFFIX, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        e = json.loads(line)
+                    except ValueError:
+                        continue    # abgeschnittene letzte Zeile nach Absturz
+                    self.utterances.append((e["start"], e["end"], e.get("t")))
+        n = os.path.getsize(path) // DTYPE.itemsize
+        self.audio = np.memmap(path, dtype=DTYPE, mode="r", shape=(n,)) if n else np.zeros(0, DTYPE)
+
+    def __len__(self):
+        return len(self.utterances)
+
+    def __getitem__(self, i):
+        start, end, _ = self.utterances[i]
+        return self.audio[start:end]
+
+
+def is_session(path):
+    return path.endswith(".f32") and os.path.exists(path + INDEX_SUFFIX)
+
+
+def create_recorder(cfg, sample_rate=16000):
+    """SessionRecorder laut Config oder None"""
+    rcfg = cfg.get("record", {})
+    if not rcfg.get("enable", False):
+        return None
+    directory = os.path.expanduser(rcfg.get("dir") or "~/.local/share/speakup/sessions")
+    return SessionRecorder(directory, sample_rate, rcfg.get("grow_seconds", 300.0))
@@ -0,0 +1,100 @@
+"""
+speakup - Config neu laden ohne Neustart
+Ein Watcher prüft die mtime der config.yaml; Änderungen werden als Liste
+geänderter Schlüssel ermittelt und der billigsten Stufe zugeordnet, auf
+der sie sich anwenden lassen (App.apply_config).
+"""
+
+import os
+import threading
+import time
+
+import yaml
+
+# Stufen von billig nach teuer; der erste passende Präfix gewinnt
+#   inplace  – Werte im laufenden VADStream/STTWorker setzen
+#   output   – Typer/OutputWorker, Ersetzen durch Finals
+#   log      – Transkript-Protokoll/Historie neu öffnen
+#   hotkey   – GlobalHotKeys neu registrieren
+#   worker   – STTWorker neu starten (Modell bleibt)
+#   engine   – neues Modell im Hintergrund laden, das alte dekodiert weiter
+#   restart  – wirkt erst nach Neustart von speakup
+RULES = (
+    ("output", ("final.replace", "final.max_erase")),   # vor "final." – kein Modellwechsel
+    ("engine", ("engine", "model", "device", "compute_type", "final.")),
+    ("worker", ("streaming.enable", "streaming.trim_seconds", "streaming.preroll_seconds",
+                "chunk.buffer_seconds")),
+    ("hotkey", ("hotkey",)),
+    ("output", ("insert_mode", "output.")),
+    ("log", ("log_transcripts", "log_path", "history.")),
+    ("inplace", ("vad.", "preprocess.", "chunk.", "language", "punctuate", "streaming.")),
+)
+LEVELS = ("inplace", "output", "log", "hotkey", "worker", "engine", "restart")
+
+
+def diff_config(old, new, prefix=""):
+    """Geänderte Schlüssel als gepunktete Pfade (z.B. 'vad.aggressiveness')"""
+    changed = []
+    for key in sorted(set(old) | set(new), key=str):
+        a, b = old.get(key), new.get(key)
+        path = prefix + str(key)
+        if isinstance(a, dict) and isinstance(b, dict):
+            changed.extend(diff_config(a, b, path + "."))
+        elif a != b:
+            changed.append(path)
+    return changed
+
+
+def classify(key):
+    for level, prefixes in RULES:
+        for p in prefixes:
+            if key == p or (p.endswith(".") and key.startswith(p)):
+                return level
+    return "restart"
+
+
+def plan_changes(changed):
+    """{stufe: [schlüssel, ...]} für eine Liste geänderter Schlüssel"""
+    plan = {}
+    for key in changed:
+        plan.setdefault(classify(key), []).append(key)
+    return plan
+
+
+class ConfigWatcher(threading.Thread):
+    """Pollt die mtime der Config und ruft on_change(cfg) mit der neuen Config.
+
+    Polling statt inotify: eine stat() pro Sekunde, keine Abhängigkeit, und
+    Editoren, die per Umbenennen speichern, werden genauso erkannt.
+    """
+
+    def __init__(self, path, on_change, interval=1.0):
+        super().__init__(daemon=True, name="ConfigWatcher")
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self.running = True
+        self._mtime = self._stat()
+
+    def _stat(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def run(self):
+        while self.running:
+            time.sleep(self.interval)
+            mtime = self._stat()
+            if mtime is None or mtime == self._mtime:
+                continue
+            self._mtime = mtime
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    cfg = yaml.safe_load(f)
+            except (OSError, yaml.YAMLError) as e:
+                # Halb gespeicherte Datei: beim nächsten Speichern erneut versuchen
+                print(f"[speakup] Config nicht lesbar, Änderung ignoriert: {e}")
+                continue
+            if isinstance(cfg, dict):
+                self.on_change(cfg)
@@ -0,0 +1,139 @@
+"""
+speakup - Polyphasen-Resampler
+Aufnahme läuft mit der nativen Rate des Geräts (meist 44.1/48 kHz); VAD und
+Engine brauchen 16 kHz. Rationales Verhältnis up/down, FIR-Tiefpass
+(Kaiser-gefenstertes sinc) in up Phasen zerlegt, pro Block vektorisiert:
+jede Ausgabe ist ein Skalarprodukt aus taps Eingangssamples und einer Phase.
+Arbeitspuffer werden angelegt, wenn ein Block größer ist als alle bisherigen,
+danach nie wieder. Größere Blöcke als MAX_BLOCK (ganze Dateien) werden in
+Abschnitten gerechnet: die Index- und Fenstermatrizen haben taps Spalten pro
+Ausgabesample und würden sonst mit der Dateilänge wachsen.
+"""
+
+from math import gcd
+
+import numpy as np
+
+# Eingabesamples pro Rechenschritt (~1.4 s bei 48 kHz, Arbeitspuffer ~20 MB)
+MAX_BLOCK = 1 << 16
+
+
+def design_filter(up, down, zeros=10, beta=8.0, rolloff=0.92):
+    """Prototyp-Tiefpass als (up, taps)-Phasenmatrix.
+
+    zeros Nulldurchgänge des sinc je Seite (wie resample_poly); die Länge
+    richtet sich nach max(up, down), damit auch beim Dezimieren die
+    Übergangsbreite passt.
+    """
+    taps = -(-2 * zeros * max(up, down) // up)
+    n = taps * up
+    # Grenzfrequenz relativ zur hochgetasteten Rate: halbe Zielrate bzw.
+    # halbe Quellrate, je nachdem, was kleiner ist
+    cutoff = rolloff * 0.5 / max(up, down)
+    t = np.arange(n) - (n - 1) / 2.0
+    h = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(n, beta)
+    h *= up / h.sum()       # Verstärkung 1 nach dem Hochtasten
+    # Phase r benutzt h[r], h[r + up], h[r + 2*up], ...
+    return np.ascontiguousarray(h.reshape(taps, up).T, dtype=np.float32)
+
+
+class PolyphaseResampler:
+    """Streaming-Resampler in_rate → out_rate für float32-Mono-Blöcke.
+
+    process() liefert einen View auf einen internen Puffer, gültig bis zum
+    nächsten Aufruf. Zustand (letzte taps-1 Samples, Phase) läuft über
+    Blockgrenzen weiter, das Ergebnis ist unabhängig von der Blockgröße.
+    """
+
+    def __init__(self, in_rate, out_rate=16000, zeros=10):
+        g = gcd(int(in_rate), int(out_rate))
+        self.in_rate = int(in_rate)
+        self.out_rate = int(out_rate)
+        self.up = self.out_rate // g
+        self.down = self.in_rate // g
+        self.filter = design_filter(self.up, self.down, zeros)
+        self.taps = taps = self.filter.shape[1]
+        # Fenster als x[n-taps+1] .. x[n], Koeffizienten passend gespiegelt
+        self._offsets = np.arange(taps, dtype=np.intp)
+        self._filter_rev = np.ascontiguousarray(self.filter[:, ::-1])
+        self._pos = 0           # nächste Ausgabe in 1/up-Samples ab Blockanfang
+        self._hist = np.zeros(taps - 1, dtype=np.float32)
+        self._capacity = 0
+        self._alloc(0)
+        self._out = np.zeros(0, dtype=np.float32)
+
+    @property
+    def delay(self):
+        """Gruppenlaufzeit in Sekunden"""
+        return (self.taps * self.up - 1) / 2.0 / (self.in_rate * self.up)
+
+    def _alloc(self, n):
+        # Arbeitspuffer für Abschnitte bis n Eingabesamples (n <= MAX_BLOCK)
+        m = -(-n * self.up // self.down) + 1
+        t = self.taps
+        self._capacity = n
+        self._buf = np.zeros(n + t - 1, dtype=np.float32)
+        self._k = np.arange(m, dtype=np.intp)
+        self._p = np.zeros(m, dtype=np.intp)
+        self._n = np.zeros(m, dtype=np.intp)
+        self._phase = np.zeros(m, dtype=np.intp)
+        self._idx = np.zeros((m, t), dtype=np.intp)
+        self._x = np.zeros((m, t), dtype=np.float32)
+        self._h = np.zeros((m, t), dtype=np.float32)
+
+    def output_length(self, n):
+        """Anzahl Ausgabesamples für die nächsten n Eingabesamples"""
+        return max(0, -(-(n * self.up - self._pos) // self.down))
+
+    def process(self, samples):
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        total = self.output_length(len(samples))
+        if total > len(self._out):
+            self._out = np.zeros(total, dtype=np.float32)
+        done = 0
+        for i in range(0, len(samples), MAX_BLOCK):
+            done += self._process(samples[i:i + MAX_BLOCK], self._out[done:])
+        return self._out[:total]
+
+    def _process(self, samples, dest):
+        # Ein Abschnitt (<= MAX_BLOCK); schreibt nach dest, gibt die Anzahl zurück
+        n = len(samples)
+        if n > self._capacity:
+            self._alloc(n)
+        t = self.taps
+        buf = self._buf[:n + t - 1]
+        buf[:t - 1] = self._hist
+        buf[t - 1:] = samples
+        m = self.output_length(n)
+
+        # Position jeder Ausgabe im hochgetasteten Raster → Eingangsindex + Phase
+        p = self._p[:m]
+        np.multiply(self._k[:m], self.down, out=p)
+        p += self._pos
+        np.floor_divide(p, self.up, out=self._n[:m])
+        np.remainder(p, self.up, out=self._phase[:m])
+
+        # Fenster x[n-taps+1 .. n] (in buf um taps-1 verschoben) und Phasenkoeffizienten
+        idx = self._idx[:m]
+        np.add(self._n[:m, None], self._offsets[None, :], out=idx)
+        x = self._x[:m]
+        np.take(buf, idx, out=x)
+        h = self._h[:m]
+        np.take(self._filter_rev, self._phase[:m], axis=0, out=h)
+        np.einsum("ij,ij->i", x, h, out=dest[:m])
+
+        self._pos += m * self.down - n * self.up
+        self._hist[:] = buf[n:]
+        return m
+
+    def reset(self):
+        self._pos = 0
+        self._hist[:] = 0
+
+
+def resample(audio, in_rate, out_rate=16000, zeros=10):
+    """Ganze Aufnahme umrechnen (z.B. Dateien in speakup transcribe)"""
+    if int(in_rate) == int(out_rate):
+        return np.asarray(audio, dtype=np.float32)
+    # Frischer Resampler: sein Ausgabepuffer gehört allein dem Ergebnis
+    return PolyphaseResampler(in_rate, out_rate, zeros).process(audio)
@@ -0,0 +1,148 @@
+"""
+speakup - Ringpuffer für Audio-Samples
+Feste Kapazität, keine Reallokation beim Schreiben.
+"""
+
+import numpy as np
+
+
+class RingBuffer:
+    """Numpy-Ringpuffer fester Kapazität für Mono-Audio.
+
+    Jedes Sample wird doppelt abgelegt (Position i und i + capacity), dadurch
+    ist jedes Fenster der letzten n <= capacity Samples ein zusammenhängender
+    View ohne Kopie. Schreiben kostet O(Blockgröße), unabhängig vom Füllstand.
+    Läuft der Puffer über, werden die ältesten Samples verworfen.
+    """
+
+    def __init__(self, capacity, dtype=np.int16):
+        if capacity <= 0:
+            raise ValueError("capacity must be > 0")
+        self.capacity = int(capacity)
+        self.dtype = np.dtype(dtype)
+        self._data = np.zeros(2 * self.capacity, dtype=self.dtype)
+        self._head = 0      # nächste Schreibposition (0..capacity-1)
+        self._size = 0      # gepufferte Samples
+        self.dropped = 0    # durch Überlauf verworfene Samples
+
+    def __len__(self):
+        return self._size
+
+    def write(self, samples):
+        """Hängt Samples an (numpy-Array oder PCM-Bytes im Puffer-dtype)"""
+        if isinstance(samples, (bytes, bytearray, memoryview)):
+            samples = np.frombuffer(samples, dtype=self.dtype)
+        else:
+            samples = np.asarray(samples).reshape(-1)
+            if samples.dtype != self.dtype:
+                samples = samples.astype(self.dtype)
+
+        n = len(samples)
+        if n == 0:
+            return
+        cap = self.capacity
+        if n > cap:
+            self.dropped += n - cap
+            samples = samples[-cap:]
+            n = cap
+
+        d = self._data
+        head = self._head
+        first = min(n, cap - head)
+        d[head:head + first] = samples[:first]
+        d[head + cap:head + cap + first] = samples[:first]
+        rest = n - first
+        if rest:
+            d[:rest] = samples[first:]
+            d[cap:cap + rest] = samples[first:]
+
+        self._head = (head + n) % cap
+        overflow = self._size + n - cap
+        if overflow > 0:
+            self.dropped += overflow
+            self._size = cap
+        else:
+            self._size += n
+
+    def view(self, n=None):
+        """Die letzten n Samples (Standard: alle) als zusammenhängender View.
+
+        Der View ist nur bis zum nächsten write() gültig – wer ihn länger
+        braucht, muss kopieren.
+        """
+        if n is None or n > self._size:
+            n = self._size
+        end = self._head + self.capacity
+        v = self._data[end - n:end]
+        v.flags.writeable = False
+        return v
+
+    def overlap(self, n):
+        """View auf die letzten n Samples (Overlap für das nächste Fenster)"""
+        return self.view(n)
+
+    def keep(self, n):
+        """Verwirft alles außer den letzten n Samples – O(1), keine Kopie"""
+        self._size = min(self._size, max(0, int(n)))
+
+    def clear(self):
+        self._size = 0
+
+
+class SPSCRing:
+    """Lock-freier Single-Producer/Single-Consumer-Ring für den Audio-Callback.
+
+    Der PortAudio-Callback (Producer) kopiert nur in den vorab angelegten
+    Speicher und veröffentlicht danach den Schreibzähler; der
+    Verarbeitungs-Thread (Consumer) liest bis dorthin und veröffentlicht den
+    Lesezähler. Jeder Zähler wird nur von einer Seite geschrieben, daher
+    braucht es keine Locks. Ist kein Platz mehr, wird der Block verworfen
+    und als Überlauf gezählt – der Callback blockiert nie.
+    """
+
+    def __init__(self, capacity, dtype=np.int16):
+        self.capacity = int(capacity)
+        self._data = np.zeros(self.capacity, dtype=dtype)
+        self._write = 0     # nur vom Producer geschrieben (monoton)
+        self._read = 0      # nur vom Consumer geschrieben (monoton)
+        self.overruns = 0   # verworfene Blöcke
+        self.dropped = 0    # verworfene Samples
+
+    def __len__(self):
+        return self._write - self._read
+
+    @property
+    def read_count(self):
+        """Bisher insgesamt gelesene Samples (Sample-Uhr des Consumers)"""
+        return self._read
+
+    def push(self, samples):
+        """Producer: Block anhängen; False bei Überlauf"""
+        n = len(samples)
+        cap = self.capacity
+        if n > cap - (self._write - self._read):
+            self.overruns += 1
+            self.dropped += n
+            return False
+        pos = self._write % cap
+        first = min(n, cap - pos)
+        self._data[pos:pos + first] = samples[:first]
+        if n > first:
+            self._data[:n - first] = samples[first:]
+        # Erst nach dem Kopieren veröffentlichen
+        self._write += n
+        return True
+
+    def pop_into(self, out):
+        """Consumer: bis zu len(out) Samples nach out kopieren; gibt Anzahl zurück"""
+        cap = self.capacity
+        n = min(len(out), self._write - self._read)
+        if n <= 0:
+            return 0
+        pos = self._read % cap
+        first = min(n, cap - pos)
+        out[:first] = self._data[pos:pos + first]
+        if n > first:
+            out[first:n] = self._data[:n - first]
+        self._read += n
+        return n
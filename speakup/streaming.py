@@ -0,0 +1,151 @@
+"""
+speakup - Streaming-Dekodierung mit Local Agreement
+Der Utterance-Puffer wird inkrementell neu dekodiert; ausgegeben werden nur
+Wörter, die zwei aufeinanderfolgende Hypothesen übereinstimmend liefern.
+"""
+
+import numpy as np
+
+from ringbuffer import RingBuffer
+
+# Zeichen, die beim Vergleich zweier Hypothesen ignoriert werden
+_STRIP = ".,!?;:…\"'“”„«»()"
+
+
+def _norm(word):
+    return word.strip().lower().strip(_STRIP)
+
+
+def _join(words):
+    return "".join(w[2] for w in words).strip()
+
+
+class HypothesisBuffer:
+    """Bestätigte vs. vorläufige Wörter.
+
+    Wörter sind Tupel (start, end, text) mit absoluten Zeiten in Sekunden.
+    """
+
+    def __init__(self):
+        self.committed = []     # bestätigt, Audio noch im Puffer
+        self.buffer = []        # vorläufig (letzte Hypothese)
+        self.new = []
+        self.last_committed_time = 0.0
+
+    def insert(self, words):
+        # Nur Wörter nach dem zuletzt bestätigten Zeitpunkt
+        new = [w for w in words if w[0] > self.last_committed_time - 0.1]
+
+        # Whisper wiederholt am Pufferanfang gern das Ende des bestätigten
+        # Textes – gleiche n-Gramme (n <= 5) verwerfen
+        if new and self.committed and abs(new[0][0] - self.last_committed_time) < 1.0:
+            for n in range(min(len(self.committed), len(new), 5), 0, -1):
+                tail = [_norm(w[2]) for w in self.committed[-n:]]
+                head = [_norm(w[2]) for w in new[:n]]
+                if tail == head:
+                    new = new[n:]
+                    break
+        self.new = new
+
+    def flush(self):
+        """Übernimmt den gemeinsamen Präfix der letzten beiden Hypothesen"""
+        commit = []
+        while self.new and self.buffer:
+            if _norm(self.new[0][2]) != _norm(self.buffer[0][2]):
+                break
+            word = self.new.pop(0)
+            self.buffer.pop(0)
+            commit.append(word)
+            self.last_committed_time = word[1]
+        self.buffer = self.new
+        self.new = []
+        self.committed.extend(commit)
+        return commit
+
+    def pop_committed(self, t):
+        """Entfernt bestätigte Wörter, die vor t enden (nach dem Trimmen)"""
+        popped = []
+        while self.committed and self.committed[0][1] <= t:
+            popped.append(self.committed.pop(0))
+        return popped
+
+
+class StreamingTranscriber:
+    """Wachsender Utterance-Puffer mit inkrementeller Neu-Dekodierung.
+
+    `transcribe(audio, prompt)` bekommt float32-Audio ab Pufferanfang und
+    liefert (words, segment_ends) mit Zeiten relativ zum Pufferanfang.
+    """
+
+    def __init__(self, transcribe, sample_rate=16000, trim_seconds=10.0,
+                 max_seconds=30.0, prompt_chars=200):
+        self.transcribe = transcribe
+        self.sample_rate = sample_rate
+        self.trim_seconds = trim_seconds
+        self.prompt_chars = prompt_chars
+        self.audio = RingBuffer(int(sample_rate * max_seconds), dtype=np.float32)
+        self.offset = 0.0       # absolute Zeit des Pufferanfangs
+        self.hyp = HypothesisBuffer()
+        self.prompt = ""        # bestätigter Text vor dem Puffer (Kontext)
+        self.tentative = ""
+        self._unprocessed = 0
+
+    def insert_audio(self, samples):
+        dropped = self.audio.dropped
+        self.audio.write(samples)
+        self._unprocessed += len(samples)
+        if self.audio.dropped != dropped:
+            # Puffer übergelaufen – Anfang wandert mit
+            self.offset += (self.audio.dropped - dropped) / self.sample_rate
+
+    def process(self):
+        """Dekodiert den Puffer neu und liefert den neu bestätigten Text"""
+        if not len(self.audio):
+            return ""
+        self._unprocessed = 0
+        audio = self.audio.view()
+        words, segment_ends = self.transcribe(audio, self.prompt)
+        off = self.offset
+        self.hyp.insert([(s + off, e + off, t) for s, e, t in words])
+        committed = self.hyp.flush()
+        self.tentative = _join(self.hyp.buffer)
+
+        if len(audio) / self.sample_rate > self.trim_seconds:
+            self._trim_at_segment([off + e for e in segment_ends])
+        return _join(committed)
+
+    def finish(self):
+        """Utterance-Ende: Rest dekodieren, alles Vorläufige übernehmen"""
+        text = self.process() if self._unprocessed else ""
+        rest = _join(self.hyp.buffer)
+        if rest:
+            self.hyp.committed.extend(self.hyp.buffer)
+            self.hyp.last_committed_time = self.hyp.buffer[-1][1]
+        self.hyp.buffer = []
+        self._trim(self.offset + len(self.audio) / self.sample_rate)
+        self.tentative = ""
+        return " ".join(t for t in (text, rest) if t)
+
+    def reset(self):
+        """Puffer verwerfen, ohne den Rest zu dekodieren (z.B. nur Stille)"""
+        self.hyp.buffer = []
+        self._unprocessed = 0
+        self._trim(self.offset + len(self.audio) / self.sample_rate)
+        self.tentative = ""
+
+    def _trim_at_segment(self, segment_ends):
+        # Letzte abgeschlossene Segmentgrenze, bis zu der alles bestätigt ist
+        # (das letzte Segment kann noch unvollständig sein)
+        ends = [e for e in segment_ends[:-1] if e <= self.hyp.last_committed_time]
+        if ends:
+            self._trim(ends[-1])
+
+    def _trim(self, t):
+        cut = int(round((t - self.offset) * self.sample_rate))
+        if cut <= 0:
+            return
+        self.audio.keep(len(self.audio) - cut)
+        self.offset = t
+        words = self.hyp.pop_committed(t)
+        if words:
+            self.prompt = (self.prompt + "".join(w[2] for w in words))[-self.prompt_chars:]
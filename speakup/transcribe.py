@@ -0,0 +1,208 @@
+"""
+speakup transcribe - Batch-Transkription aufgenommener Audiodateien
+Verteilt WAV/FLAC-Dateien auf einen Pool von Worker-Prozessen (je ein
+geladenes Modell) und schreibt die Ergebnisse als JSONL, sobald sie fertig sind.
+Sitzungsaufnahmen (.f32 mit Index) werden pro Äußerung transkribiert.
+"""
+
+import glob
+import json
+import os
+import sys
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from engines import final_config
+from recorder import SessionRecording, is_session
+from resample import resample
+
+# Optional: soundfile für FLAC (und WAV mit Float-Samples)
+try:
+    import soundfile
+    SOUNDFILE_AVAILABLE = True
+except (ImportError, OSError):
+    SOUNDFILE_AVAILABLE = False
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".f32")
+SAMPLE_RATE = 16000
+
+
+def add_parser(sub):
+    p = sub.add_parser("transcribe", help="Audiodateien (WAV/FLAC) im Batch transkribieren")
+    p.add_argument("inputs", nargs="+",
+                   help="Dateien, Verzeichnisse oder Glob-Muster; Sitzung#N für eine Äußerung")
+    p.add_argument("-o", "--output", help="JSONL-Ausgabedatei (Standard: stdout)")
+    p.add_argument("-j", "--workers", type=int, help="Anzahl Worker-Prozesse")
+    p.add_argument("--device", help="Überschreibt device aus der Config")
+    p.add_argument("--model", help="Überschreibt model aus der Config")
+    p.add_argument("--resume", action="store_true",
+                   help="Bereits in --output vorhandene Dateien überspringen")
+    return p
+
+
+def find_files(inputs):
+    """Dateien, Verzeichnisse (rekursiv) und Glob-Muster auflösen"""
+    files = []
+    sessions = []
+    for item in inputs:
+        path, sep, n = item.rpartition("#")
+        if sep and n.isdigit() and is_session(path):
+            sessions.append(f"{os.path.abspath(path)}#{n}")
+        elif os.path.isdir(item):
+            for root, _, names in os.walk(item):
+                files.extend(os.path.join(root, n) for n in names
+                             if n.lower().endswith(AUDIO_EXTENSIONS))
+        elif os.path.isfile(item):
+            files.append(item)
+        else:
+            files.extend(f for f in glob.glob(item, recursive=True)
+                         if f.lower().endswith(AUDIO_EXTENSIONS))
+    # .f32 ohne Index sind keine Sitzungen (z.B. ausgelagerte Äußerungen)
+    files = [f for f in files if not f.endswith(".f32") or is_session(f)]
+    # Duplikate raus; große Dateien zuerst, damit der Pool gleichmäßig ausläuft
+    files = sorted(set(os.path.abspath(f) for f in files))
+    files.sort(key=os.path.getsize, reverse=True)
+    # Sitzungen in ihre Äußerungen auflösen (Index lesen, Audio bleibt auf der Platte)
+    out = []
+    for f in files:
+        if f.endswith(".f32"):
+            out.extend(f"{f}#{i}" for i in range(len(SessionRecording(f))))
+        else:
+            out.append(f)
+    return out + sorted(set(sessions) - set(out))
+
+
+def load_audio(path):
+    """Audiodatei als float32 mono 16 kHz laden"""
+    session, sep, n = path.rpartition("#")
+    if sep and n.isdigit():
+        # Äußerung aus einer Sitzungsaufnahme: View auf die gemappte Datei
+        return SessionRecording(session)[int(n)]
+    if SOUNDFILE_AVAILABLE:
+        audio, sr = soundfile.read(path, dtype="float32", always_2d=True)
+    else:
+        if not path.lower().endswith(".wav"):
+            raise RuntimeError("FLAC benötigt soundfile (pip install soundfile)")
+        with wave.open(path, "rb") as w:
+            if w.getsampwidth() != 2:
+                raise RuntimeError("Nur 16-bit PCM WAV ohne soundfile")
+            sr = w.getframerate()
+            raw = w.readframes(w.getnframes())
+            audio = np.frombuffer(raw, dtype=np.int16).reshape(-1, w.getnchannels())
+            audio = audio.astype(np.float32) / 32768.0
+
+    audio = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+    if sr != SAMPLE_RATE:
+        audio = resample(audio, sr, SAMPLE_RATE)
+    return np.ascontiguousarray(audio, dtype=np.float32)
+
+
+# --- Worker-Prozess -------------------------------------------------------
+
+_engine = None
+_lang = None
+
+
+def _init_worker(cfg):
+    global _engine, _lang
+    import main
+    _engine = main.init_engine(cfg)
+    _lang = None if cfg["language"] == "auto" else cfg["language"]
+
+
+def _transcribe_file(path):
+    t0 = time.perf_counter()
+    try:
+        audio = load_audio(path)
+        duration = len(audio) / SAMPLE_RATE
+        text = _engine.transcribe(audio, language=_lang).text.strip()
+    except Exception as e:
+        return {"file": path, "error": f"{type(e).__name__}: {e}"}
+    elapsed = time.perf_counter() - t0
+    return {
+        "file": path,
+        "text": text,
+        "duration": round(duration, 3),
+        "elapsed": round(elapsed, 3),
+        "rtf": round(elapsed / duration, 4) if duration else None,
+        "pid": os.getpid(),
+    }
+
+
+# --- CLI -------------------------------------------------------------------
+
+def _done_files(path):
+    done = set()
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if "error" not in rec:
+                    done.add(rec["file"])
+    return done
+
+
+def run(args):
+    from main import load_config
+    cfg = load_config(args.config)
+    # Offline zählt Genauigkeit, nicht Latenz: mit final.enable nur das Final-Modell
+    cfg = final_config(cfg) or cfg
+    if args.device:
+        cfg["device"] = args.device
+    if args.model:
+        cfg["model"] = args.model
+
+    files = find_files(args.inputs)
+    if not files:
+        print("[speakup] Keine Audiodateien gefunden", file=sys.stderr)
+        return 1
+    if args.resume:
+        done = _done_files(args.output)
+        files = [f for f in files if f not in done]
+        if not files:
+            print("[speakup] Alle Dateien bereits transkribiert", file=sys.stderr)
+            return 0
+
+    bcfg = cfg.get("batch", {})
+    cores = os.cpu_count() or 1
+    workers = args.workers or bcfg.get("workers") or max(1, cores // 2)
+    workers = max(1, min(workers, len(files)))
+    # Kerne auf die Worker aufteilen statt jeden Prozess alle nutzen zu lassen
+    if cfg["device"] == "cpu" and not cfg.get("cpu_threads"):
+        cfg["cpu_threads"] = max(1, cores // workers)
+
+    print(f"[speakup] {len(files)} Dateien, {workers} Worker – Model: {cfg['model']} ({cfg['device']})",
+          file=sys.stderr)
+
+    out = open(args.output, "a" if args.resume else "w", encoding="utf-8") if args.output else sys.stdout
+    failed = 0
+    total_audio = 0.0
+    t0 = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cfg,)) as pool:
+            futures = [pool.submit(_transcribe_file, f) for f in files]
+            for i, fut in enumerate(as_completed(futures), 1):
+                rec = fut.result()
+                if "error" in rec:
+                    failed += 1
+                    print(f"[speakup] ✗ {rec['file']}: {rec['error']}", file=sys.stderr)
+                else:
+                    total_audio += rec["duration"]
+                out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                out.flush()
+                print(f"[speakup] {i}/{len(files)}", file=sys.stderr, end="\r")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    wall = time.perf_counter() - t0
+    speed = total_audio / wall if wall else 0.0
+    print(f"\n[speakup] Fertig: {len(files) - failed} ok, {failed} Fehler – "
+          f"{total_audio:.0f}s Audio in {wall:.0f}s ({speed:.1f}x Echtzeit)", file=sys.stderr)
+    return 1 if failed else 0
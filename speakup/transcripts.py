@@ -0,0 +1,255 @@
+"""
+speakup - Transkript-Protokoll
+Abgeschlossene Äußerungen (Text, Zeiten, Latenz, Modell, Audio-Offsets)
+werden von einem eigenen Thread gebündelt an eine Datei angehängt – der
+Tipp-Pfad wartet nie auf die Platte.
+
+Mit history.enable schreibt derselbe Thread jeden Batch zusätzlich in die
+durchsuchbare Historie (history.py).
+
+Format: transcripts.log enthält Datensätze aus 4 Byte Länge (uint32
+little-endian) und kompaktem JSON; transcripts.log.idx je Datensatz 16 Byte
+(Byte-Offset uint64, Endzeit float64). Über den Index lassen sich Anzahl,
+Zeitbereiche und einzelne Einträge finden, ohne die Datei zu lesen.
+"""
+
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import struct
+import threading
+
+import numpy as np
+
+from history import History, history_path
+
+_LEN = struct.Struct("<I")
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("end", "<f8")])
+INDEX_SUFFIX = ".idx"
+DEFAULT_PATH = "~/.local/share/speakup/transcripts.log"
+
+_STOP = object()
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def _encode(record):
+    data = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return _LEN.pack(len(data)) + data
+
+
+class TranscriptLog(threading.Thread):
+    """Schreib-Thread: sammelt bis zu flush_ms, dann ein write() pro Datei.
+
+    path=None schreibt keine Protokolldatei (nur Historie).
+    """
+
+    def __init__(self, path, flush_ms=500, max_batch=256, history_path=None):
+        super().__init__(daemon=True, name="TranscriptLog")
+        self.path = path
+        self.history_path = history_path
+        self.flush_wait = flush_ms / 1000.0
+        self.max_batch = max_batch
+        self.q = queue.SimpleQueue()
+        self.written = 0
+        self.batches = 0
+        self._data = self._index = None
+        if path:
+            self.index_path = path + INDEX_SUFFIX
+            d = os.path.dirname(path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            self._recover()
+            self._data = open(path, "ab")
+            self._index = open(self.index_path, "ab")
+
+    def _recover(self):
+        # Nach einem Absturz: Index und Datei auf den letzten vollständigen
+        # Datensatz kürzen, damit beide wieder zueinander passen
+        if not os.path.exists(self.path):
+            open(self.index_path, "wb").close()
+            return
+        if not os.path.exists(self.index_path):
+            self._rebuild_index()
+        size = os.path.getsize(self.path)
+        index = _read_index(self.index_path)
+        end = 0
+        valid = 0
+        with open(self.path, "rb") as f:
+            for offset in index["offset"]:
+                f.seek(int(offset))
+                head = f.read(_LEN.size)
+                if len(head) < _LEN.size:
+                    break
+                rec_end = int(offset) + _LEN.size + _LEN.unpack(head)[0]
+                if rec_end > size:
+                    break
+                end = rec_end
+                valid += 1
+        if valid < len(index) or end < size:
+            with open(self.path, "r+b") as f:
+                f.truncate(end)
+            with open(self.index_path, "r+b") as f:
+                f.truncate(valid * INDEX_DTYPE.itemsize)
+
+    def _rebuild_index(self):
+        # Index fehlt (z.B. gelöscht): einmal die Datei durchgehen
+        entries = []
+        with open(self.path, "rb") as f:
+            data = f.read()
+        pos = 0
+        while pos + _LEN.size <= len(data):
+            (n,) = _LEN.unpack_from(data, pos)
+            if pos + _LEN.size + n > len(data):
+                break
+            try:
+                end = json.loads(data[pos + _LEN.size:pos + _LEN.size + n]).get("end") or 0.0
+            except ValueError:
+                break
+            entries.append((pos, end))
+            pos += _LEN.size + n
+        np.array(entries, dtype=INDEX_DTYPE).tofile(self.index_path)
+
+    def log(self, record):
+        """Nicht blockierend; record ist ein JSON-fähiges dict mit 'end'"""
+        self.q.put(record)
+
+    def close(self, timeout=2.0):
+        self.q.put(_STOP)
+        self.join(timeout)
+
+    def _collect(self):
+        batch = [self.q.get()]
+        if batch[0] is _STOP:
+            return batch
+        try:
+            # Kurz weitere Einträge abwarten: ein write() statt vieler
+            while len(batch) < self.max_batch:
+                item = self.q.get(timeout=self.flush_wait)
+                batch.append(item)
+                if item is _STOP:
+                    break
+        except queue.Empty:
+            pass
+        return batch
+
+    def run(self):
+        history = None
+        if self.history_path:
+            # sqlite3-Verbindungen gehören dem Thread, der sie öffnet
+            try:
+                history = History(self.history_path)
+            except sqlite3.Error as e:
+                print(f"[speakup] Historie nicht verfügbar: {e}")
+        try:
+            while True:
+                batch = self._collect()
+                records = [r for r in batch if r is not _STOP]
+                if records:
+                    if self._data:
+                        self._write(records)
+                    if history:
+                        try:
+                            history.add(records)
+                        except sqlite3.Error as e:
+                            print(f"[speakup] Historie: {e}")
+                    self.written += len(records)
+                    self.batches += 1
+                if len(records) < len(batch):
+                    break
+        finally:
+            if self._data:
+                self._data.close()
+                self._index.close()
+            if history:
+                history.close()
+
+    def _write(self, records):
+        offset = self._data.tell()
+        chunks = [_encode(r) for r in records]
+        index = np.zeros(len(chunks), dtype=INDEX_DTYPE)
+        for i, (r, c) in enumerate(zip(records, chunks)):
+            index[i] = (offset, r.get("end") or 0.0)
+            offset += len(c)
+        # Erst die Daten, dann der Index – der Index zeigt nie ins Leere
+        self._data.write(b"".join(chunks))
+        self._data.flush()
+        self._index.write(index.tobytes())
+        self._index.flush()
+
+
+def _read_index(path):
+    if not os.path.exists(path):
+        return np.zeros(0, dtype=INDEX_DTYPE)
+    n = os.path.getsize(path) // INDEX_DTYPE.itemsize
+    return np.fromfile(path, dtype=INDEX_DTYPE, count=n)
+
+
+class TranscriptReader:
+    """Lesezugriff über den Index; Einträge werden erst bei Bedarf gelesen"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = os.path.expanduser(path)
+        self.index = _read_index(self.path + INDEX_SUFFIX)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, i):
+        with open(self.path, "rb") as f:
+            return self._read(f, int(self.index["offset"][i]))
+
+    def _read(self, f, offset):
+        f.seek(offset)
+        (n,) = _LEN.unpack(f.read(_LEN.size))
+        return json.loads(f.read(n))
+
+    def range(self, start=None, end=None):
+        """Einträge mit Endzeit in [start, end) – Suche im Index, nicht in der Datei"""
+        ends = self.index["end"]
+        lo = 0 if start is None else int(np.searchsorted(ends, start, "left"))
+        hi = len(ends) if end is None else int(np.searchsorted(ends, end, "left"))
+        return self.read(lo, hi)
+
+    def read(self, lo=0, hi=None):
+        hi = len(self.index) if hi is None else min(hi, len(self.index))
+        if lo >= hi:
+            return []
+        with open(self.path, "rb") as f:
+            # Einträge liegen hintereinander: ein Lesevorgang für den Bereich
+            start = int(self.index["offset"][lo])
+            f.seek(start)
+            data = f.read(int(self.index["offset"][hi]) - start if hi < len(self.index) else -1)
+        out = []
+        pos = 0
+        for _ in range(hi - lo):
+            (n,) = _LEN.unpack_from(data, pos)
+            out.append(json.loads(data[pos + _LEN.size:pos + _LEN.size + n]))
+            pos += _LEN.size + n
+        return out
+
+
+def create_transcript_log(cfg):
+    """TranscriptLog laut Config (log_transcripts, log_path, history) oder None.
+
+    Ein Schreiber pro Datei und Prozess – neue App-Instanzen (GUI Start/Stop)
+    teilen sich den laufenden Thread.
+    """
+    hist = history_path(cfg)
+    path = None
+    if cfg.get("log_transcripts", False):
+        path = os.path.abspath(os.path.expanduser(cfg.get("log_path") or DEFAULT_PATH))
+    if not path and not hist:
+        return None
+    key = (path, hist)
+    with _writers_lock:
+        log = _writers.get(key)
+        if log is None or not log.is_alive():
+            log = TranscriptLog(path, history_path=hist)
+            log.start()
+            atexit.register(log.close)
+            _writers[key] = log
+    return log